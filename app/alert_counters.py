@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import os
+import threading
+from collections import Counter
+from sqlalchemy import event
+from sqlmodel import Session, func, select
+from app.models import Alert
+from app.sensor_cache import sensor_cache
+from app.utils import read_engine
+
+
+def open_alerts_query():
+    return (
+        select(Alert.sensor_id, Alert.type, func.count())
+        .where(Alert.acknowledged == False)
+        .group_by(Alert.sensor_id, Alert.type)
+    )
+
+
+class AlertCounters:
+    """
+    In-memory counts of open (unacknowledged) alerts: in total, per type,
+    per parcel and per sensor.
+
+    Counts are loaded from the `Alert` table on first use and then kept up
+    to date by the paths that write alerts: `track` applies alerts created
+    in a session once that session commits, `remove` applies acknowledged
+    alerts. Reads never query the database. A background task reconciles
+    the counts with the table every `interval` seconds in case an alert
+    was changed by another process or by hand.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._changes = 0
+        self._task = None
+        self._reset(Counter())
+
+    def _reset(self, open_alerts: Counter):
+        self._open = open_alerts
+        self._total = 0
+        self._by_type = Counter()
+        self._by_parcel = Counter()
+        self._by_sensor = Counter()
+        for key, count in open_alerts.items():
+            self._add(key, count)
+
+    def _add(self, key, delta: int):
+        sensor_id, type_ = key
+        sensor = sensor_cache.get(sensor_id)
+        parcel_id = sensor.parcel_id if sensor is not None else None
+        self._total += delta
+        for counter, name in (
+            (self._by_type, type_),
+            (self._by_parcel, parcel_id),
+            (self._by_sensor, sensor_id),
+        ):
+            counter[name] += delta
+            if counter[name] <= 0:
+                del counter[name]
+
+    def _read(self) -> Counter:
+        with Session(read_engine) as session:
+            rows = session.execute(open_alerts_query()).all()
+        return Counter({(sensor_id, type_): count for sensor_id, type_, count in rows})
+
+    def load(self):
+        open_alerts = self._read()
+        with self._lock:
+            self._reset(open_alerts)
+            self._loaded = True
+            self._changes += 1
+
+    def reconcile(self) -> bool:
+        """
+        Compare the counts with the table and replace them if they drifted.
+        Skipped (returns False) if alerts changed while the table was read.
+        """
+        with self._lock:
+            changes = self._changes
+        open_alerts = self._read()
+        with self._lock:
+            if changes != self._changes:
+                return False
+            if self._loaded and self._open != open_alerts:
+                logging.warning("Alert counters drifted from the Alert table")
+            self._reset(open_alerts)
+            self._loaded = True
+            return True
+
+    def _apply(self, keys, delta: int):
+        with self._lock:
+            if not self._loaded:
+                return
+            for key in keys:
+                if self._open[key] + delta < 0:
+                    continue
+                self._open[key] += delta
+                if not self._open[key]:
+                    del self._open[key]
+                self._add(key, delta)
+            self._changes += 1
+
+    def track(self, session, alerts: list[Alert]):
+        """Count `alerts`, added to `session`, once the session commits."""
+        pending = session.info.setdefault("new_alert_keys", [])
+        if not pending:
+
+            def committed(session):
+                self._apply(session.info.pop("new_alert_keys", []), 1)
+
+            def rolled_back(session):
+                session.info.pop("new_alert_keys", None)
+
+            event.listen(session, "after_commit", committed, once=True)
+            event.listen(session, "after_rollback", rolled_back, once=True)
+        pending.extend((alert.sensor_id, alert.type) for alert in alerts)
+
+    def remove(self, keys):
+        """Uncount acknowledged alerts given as `(sensor_id, type)` pairs."""
+        self._apply(keys, -1)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def total(self) -> int:
+        self._ensure_loaded()
+        return self._total
+
+    def by_type(self, type_: str) -> int:
+        self._ensure_loaded()
+        return self._by_type[type_]
+
+    def by_parcel(self, parcel_id: int) -> int:
+        self._ensure_loaded()
+        return self._by_parcel[parcel_id]
+
+    def by_sensor(self, sensor_id: int) -> int:
+        self._ensure_loaded()
+        return self._by_sensor[sensor_id]
+
+    def counts(self) -> dict:
+        """Every counter, for the API."""
+        self._ensure_loaded()
+        with self._lock:
+            return {
+                "total": self._total,
+                "by_type": dict(self._by_type),
+                "by_parcel": dict(self._by_parcel),
+                "by_sensor": dict(self._by_sensor),
+            }
+
+    def start(self):
+        """Start the periodic reconciliation task if needed."""
+        if not self.interval or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.reconcile)
+            except Exception as e:
+                logging.exception(f"Error reconciling alert counters: {e}")
+
+
+alert_counters = AlertCounters(
+    interval=float(os.environ.get("ALERT_COUNTERS_RECONCILE_SECONDS", "300"))
+)
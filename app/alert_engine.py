@@ -0,0 +1,173 @@
+import os
+import threading
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlmodel import select, Session
+from app.models import Alert
+from app.alert_counters import alert_counters
+from app.sensor_cache import sensor_cache
+from app.utils import read_engine
+
+
+def alert_message(sensor, violation_type: str, value: float) -> str:
+    if violation_type == "LOW":
+        return f"Value {value:.1f} {sensor.unit} is below minimum threshold {sensor.threshold_low} {sensor.unit}"
+    return f"Value {value:.1f} {sensor.unit} is above maximum threshold {sensor.threshold_high} {sensor.unit}"
+
+
+def check_thresholds(sensor, value: float):
+    """Return `(violation_type, message)` for a reading, or `(None, "")`."""
+    if value < sensor.threshold_low:
+        return "LOW", alert_message(sensor, "LOW", value)
+    if value > sensor.threshold_high:
+        return "HIGH", alert_message(sensor, "HIGH", value)
+    return None, ""
+
+
+def open_alerts_by_time_query():
+    return (
+        select(Alert.sensor_id, Alert.type, Alert.timestamp)
+        .where(Alert.acknowledged == False)
+        .order_by(Alert.timestamp)
+    )
+
+
+@dataclass
+class SensorAlertState:
+    """Where a sensor stands in the alert state machine."""
+
+    type: str | None = None
+    since: datetime | None = None
+    raised: bool = False
+    last_seen: datetime | None = None
+    last_raised: dict[str, datetime] = field(default_factory=dict)
+
+
+class AlertEngine:
+    """
+    Evaluates readings against sensor thresholds as they are ingested.
+
+    Each sensor has an in-memory state: normal, pending (a threshold is
+    violated) or raised. A violation is raised as an `Alert` row once it
+    has lasted `min_duration` and no alert of the same type was raised for
+    the sensor within `cooldown`; that transition is the only write. The
+    state returns to normal only when the value comes back inside the
+    threshold by `hysteresis` (a fraction of the low-high range), so a
+    value oscillating around a threshold, or staying out of range after
+    its alert was acknowledged, does not raise new alerts. Durations use
+    reading timestamps; readings older than the last one seen for a sensor
+    do not change its state.
+
+    `evaluate` works on copies of the states it touches, kept on the
+    caller's session and applied only when that session commits, so a
+    rolled-back batch leaves the engine as it was. The states are built
+    from the open alerts in the `Alert` table on first use, so checking a
+    reading never queries the database.
+    """
+
+    def __init__(self, hysteresis: float, min_duration: float, cooldown: float):
+        self.hysteresis = hysteresis
+        self.min_duration = timedelta(seconds=min_duration)
+        self.cooldown = timedelta(seconds=cooldown)
+        self._lock = threading.Lock()
+        self._states: dict[int, SensorAlertState] | None = None
+
+    def load(self):
+        with Session(read_engine) as session:
+            rows = session.execute(open_alerts_by_time_query()).all()
+        states = {}
+        for sensor_id, type_, timestamp in rows:
+            state = states.setdefault(sensor_id, SensorAlertState())
+            state.type, state.since, state.raised = type_, timestamp, True
+            state.last_raised[type_] = timestamp
+        with self._lock:
+            self._states = states
+
+    def _persists(self, sensor, type_: str, value: float) -> bool:
+        """Whether a `type_` violation is still on, allowing for hysteresis."""
+        band = self.hysteresis * max(sensor.threshold_high - sensor.threshold_low, 0)
+        if type_ == "HIGH":
+            return value > sensor.threshold_high - band
+        return value < sensor.threshold_low + band
+
+    def _step(self, sensor, state: SensorAlertState, value: float, timestamp):
+        """Advance one sensor by one reading; returns the type to raise or None."""
+        if state.type is not None and not self._persists(sensor, state.type, value):
+            state.type, state.since, state.raised = None, None, False
+        if state.type is None:
+            violation_type, _ = check_thresholds(sensor, value)
+            if violation_type is None:
+                return None
+            state.type, state.since = violation_type, timestamp
+        if state.raised or timestamp - state.since < self.min_duration:
+            return None
+        last_raised = state.last_raised.get(state.type)
+        if last_raised is not None and timestamp - last_raised < self.cooldown:
+            return None
+        state.raised = True
+        state.last_raised[state.type] = timestamp
+        return state.type
+
+    def _staged(self, session) -> dict[int, SensorAlertState]:
+        """The states changed in `session`, applied when it commits."""
+        staged = session.info.get("alert_states")
+        if staged is None:
+            staged = session.info["alert_states"] = {}
+
+            def committed(session):
+                changed = session.info.pop("alert_states", {})
+                with self._lock:
+                    if self._states is not None:
+                        self._states.update(changed)
+
+            def rolled_back(session):
+                session.info.pop("alert_states", None)
+
+            event.listen(session, "after_commit", committed, once=True)
+            event.listen(session, "after_rollback", rolled_back, once=True)
+        return staged
+
+    def evaluate(self, session, readings) -> list[Alert]:
+        """Add `Alert` rows for `readings` to the caller's session."""
+        if self._states is None:
+            self.load()
+        staged = self._staged(session)
+        new_alerts = []
+        with self._lock:
+            for reading in readings:
+                sensor = sensor_cache.get(reading["sensor_id"])
+                if sensor is None:
+                    continue
+                state = staged.get(sensor.id)
+                if state is None:
+                    current = self._states.get(sensor.id) or SensorAlertState()
+                    state = staged[sensor.id] = replace(
+                        current, last_raised=dict(current.last_raised)
+                    )
+                timestamp = reading["timestamp"]
+                if state.last_seen is not None and timestamp < state.last_seen:
+                    continue
+                state.last_seen = timestamp
+                violation_type = self._step(sensor, state, reading["value"], timestamp)
+                if violation_type is None:
+                    continue
+                new_alerts.append(
+                    Alert(
+                        sensor_id=sensor.id,
+                        type=violation_type,
+                        message=alert_message(sensor, violation_type, reading["value"]),
+                        timestamp=timestamp,
+                    )
+                )
+        session.add_all(new_alerts)
+        if new_alerts:
+            alert_counters.track(session, new_alerts)
+        return new_alerts
+
+
+alert_engine = AlertEngine(
+    hysteresis=float(os.environ.get("ALERT_HYSTERESIS", "0.05")),
+    min_duration=float(os.environ.get("ALERT_MIN_DURATION_SECONDS", "0")),
+    cooldown=float(os.environ.get("ALERT_COOLDOWN_SECONDS", "600")),
+)
@@ -0,0 +1,138 @@
+from sqlalchemy import func, tuple_, update
+from sqlmodel import Session, select
+from app.models import Alert, Sensor
+from app.alert_counters import alert_counters
+from app.dashboard_feed import dashboard_feed
+from app.utils import engine
+
+ALERTS_PAGE_SIZE = 50
+ALERT_FILTER_TYPES = ("all", "HIGH", "LOW")
+
+
+def alerts_query(
+    filter_type: str = "all",
+    show_history: bool = False,
+    before=None,
+    after=None,
+    limit: int = ALERTS_PAGE_SIZE,
+):
+    """
+    Alerts joined to their sensors, newest first, for one page of the list.
+
+    Pages are addressed by a `(timestamp, id)` key: `before` selects the
+    page of older alerts, `after` the page of newer alerts (returned oldest
+    first, so the caller reverses it). Both walk an index on `timestamp`,
+    the partial one on open alerts unless `show_history` is set, and read
+    at most `limit` rows.
+    """
+    query = select(
+        Alert.id,
+        Alert.sensor_id,
+        Alert.type,
+        Alert.message,
+        Alert.timestamp,
+        func.strftime("%Y-%m-%d %H:%M", Alert.timestamp).label("timestamp_str"),
+        Alert.acknowledged,
+        Sensor.id_code,
+        Sensor.type.label("sensor_type"),
+    ).outerjoin(Sensor, Sensor.id == Alert.sensor_id)
+    if not show_history:
+        query = query.where(Alert.acknowledged == False)
+    if filter_type != "all":
+        query = query.where(Alert.type == filter_type)
+    key = tuple_(Alert.timestamp, Alert.id)
+    if after is not None:
+        return (
+            query.where(key > tuple_(*after))
+            .order_by(Alert.timestamp.asc(), Alert.id.asc())
+            .limit(limit)
+        )
+    if before is not None:
+        query = query.where(key < tuple_(*before))
+    return query.order_by(Alert.timestamp.desc(), Alert.id.desc()).limit(limit)
+
+
+def alerts_page(
+    session,
+    filter_type: str = "all",
+    show_history: bool = False,
+    before=None,
+    after=None,
+    limit: int = ALERTS_PAGE_SIZE,
+):
+    """
+    One page of alerts for the alerts list, newest first.
+
+    Returns:
+        `(rows, has_older, has_newer)` where `rows` are dicts ready for
+        display, each with a `cursor` key for `before`/`after`.
+    """
+    rows = session.execute(
+        alerts_query(filter_type, show_history, before, after, limit + 1)
+    ).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if after is not None:
+        rows.reverse()
+        has_older, has_newer = True, more
+    else:
+        has_older, has_newer = more, before is not None
+    page = [
+        {
+            "id": row.id,
+            "sensor_id": row.sensor_id,
+            "sensor_code": row.id_code or "Unknown",
+            "sensor_type": row.sensor_type or "",
+            "type": row.type,
+            "message": row.message,
+            "timestamp": row.timestamp_str,
+            "acknowledged": row.acknowledged,
+            "color": "red" if row.type == "HIGH" else "amber",
+            "cursor": [row.timestamp.isoformat(), row.id],
+        }
+        for row in rows
+    ]
+    return page, has_older, has_newer
+
+
+def acknowledge_alerts(
+    alert_ids=None, sensor_id=None, parcel_id=None, alert_type=None
+) -> list[int]:
+    """
+    Acknowledge every open alert matching all of the given criteria with a
+    single `UPDATE ... RETURNING`; no criteria acknowledges every open
+    alert. Acknowledging does not re-arm the alert engine: a sensor that is
+    still out of range raises no new alert until it has recovered.
+
+    Args:
+        alert_ids: Only these alerts
+        sensor_id: Only alerts of this sensor
+        parcel_id: Only alerts of sensors on this parcel
+        alert_type: Only alerts of this type ("HIGH" or "LOW")
+
+    Returns:
+        The ids of the alerts that were acknowledged.
+    """
+    statement = update(Alert).where(Alert.acknowledged == False)
+    if alert_ids is not None:
+        statement = statement.where(Alert.id.in_(alert_ids))
+    if sensor_id is not None:
+        statement = statement.where(Alert.sensor_id == sensor_id)
+    if parcel_id is not None:
+        statement = statement.where(
+            Alert.sensor_id.in_(select(Sensor.id).where(Sensor.parcel_id == parcel_id))
+        )
+    if alert_type is not None:
+        statement = statement.where(Alert.type == alert_type)
+    statement = (
+        statement.values(acknowledged=True)
+        .returning(Alert.id, Alert.sensor_id, Alert.type)
+        .execution_options(synchronize_session=False)
+    )
+    with Session(engine) as session:
+        rows = session.execute(statement).all()
+        session.commit()
+    alert_counters.remove((row.sensor_id, row.type) for row in rows)
+    if rows:
+        dashboard_feed.notify()
+    return [row.id for row in rows]
@@ -1,13 +1,43 @@
-from fastapi import APIRouter, HTTPException, Query
+import csv
+import heapq
+import json
+import time
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 from typing import Optional
-from datetime import datetime
-from pydantic import BaseModel
-from app.utils import engine
-from app.models import Parcel, Sensor, SensorData
+from datetime import datetime, timedelta
+from pydantic import BaseModel, ValidationError
+from app.utils import engine, read_engine
+from app.models import Alert, Parcel, Sensor
+from app.ingest import build_reading, write_readings
+from app.ingest_queue import ingest_queue
+from app.sensor_cache import parcel_sensors_query, sensor_cache
+from app.alert_counters import alert_counters
+from app.alerts import acknowledge_alerts
+from app.dashboard_feed import dashboard_feed
+from app.export import EXPORT_FORMATS, export_readings, parquet_available
+from app.history import (
+    bucketed_history,
+    decode_cursor,
+    history_page,
+    parse_aggregates,
+    parse_duration,
+)
+from app.rollups import (
+    RESOLUTIONS,
+    choose_resolution,
+    from_epoch,
+    naive_utc,
+    rollup_query,
+)
 
 router = APIRouter(prefix="/api")
 
+IMPORT_FORMATS = ("ndjson", "csv")
+MAX_REPORTED_REJECTS = 100
+
 
 class SensorDataInput(BaseModel):
     timestamp: Optional[datetime] = None
@@ -15,6 +45,20 @@ class SensorDataInput(BaseModel):
     unit: Optional[str] = None
 
 
+class SensorDataBatchItem(SensorDataInput):
+    sensor_id: int
+
+
+class SensorDataBatch(BaseModel):
+    # Items are validated one by one so a bad item is rejected on its own.
+    readings: list[dict]
+
+
+def _validation_detail(error: ValidationError) -> str:
+    first = error.errors()[0]
+    return f"{'.'.join(map(str, first['loc']))}: {first['msg']}"
+
+
 class SensorCreate(BaseModel):
     id_code: str
     parcel_id: int
@@ -25,6 +69,14 @@ class SensorCreate(BaseModel):
     threshold_high: float
 
 
+class AlertAcknowledge(BaseModel):
+    alert_ids: Optional[list[int]] = None
+    sensor_id: Optional[int] = None
+    parcel_id: Optional[int] = None
+    type: Optional[str] = None
+    all: bool = False
+
+
 class ParcelCreate(BaseModel):
     name: str
     location: str
@@ -35,7 +87,7 @@ class ParcelCreate(BaseModel):
 @router.get("/parcels")
 def get_parcels():
     """List all registered parcels."""
-    with Session(engine) as session:
+    with Session(read_engine) as session:
         parcels = session.exec(select(Parcel)).all()
         return parcels
 
@@ -54,17 +106,14 @@ def create_parcel(parcel: ParcelCreate):
 @router.get("/parcels/{parcel_id}/sensors")
 def get_parcel_sensors(parcel_id: int):
     """Get all sensors associated with a specific parcel."""
-    with Session(engine) as session:
-        sensors = session.exec(
-            select(Sensor).where(Sensor.parcel_id == parcel_id)
-        ).all()
-        return sensors
+    with Session(read_engine) as session:
+        return session.exec(parcel_sensors_query(parcel_id)).all()
 
 
 @router.get("/sensors")
 def get_sensors():
     """List all sensors in the system."""
-    with Session(engine) as session:
+    with Session(read_engine) as session:
         sensors = session.exec(select(Sensor)).all()
         return sensors
 
@@ -77,34 +126,274 @@ def create_sensor(sensor: SensorCreate):
         session.add(db_sensor)
         session.commit()
         session.refresh(db_sensor)
-        return db_sensor
+    sensor_cache.invalidate()
+    return db_sensor
 
 
-@router.post("/sensors/{sensor_id}/data")
-def receive_sensor_data(sensor_id: int, data: SensorDataInput):
-    """Submit a new data reading for a sensor."""
+def _store_sensor_data(sensor_id: int, data: SensorDataInput):
+    if not sensor_cache.get(sensor_id):
+        raise HTTPException(status_code=404, detail="Sensor not found")
     with Session(engine) as session:
-        sensor = session.get(Sensor, sensor_id)
-        if not sensor:
-            raise HTTPException(status_code=404, detail="Sensor not found")
-        new_data = SensorData(
-            sensor_id=sensor_id,
-            timestamp=data.timestamp or datetime.utcnow(),
-            value=data.value,
-            raw=str(data.value),
+        (data_id,) = write_readings(
+            session, [build_reading(sensor_id, data.value, data.timestamp)]
         )
-        session.add(new_data)
         session.commit()
-        session.refresh(new_data)
-        return {"status": "success", "data_id": new_data.id}
+    dashboard_feed.notify()
+    return {"status": "success", "data_id": data_id}
+
+
+@router.post("/sensors/{sensor_id}/data")
+async def receive_sensor_data(sensor_id: int, data: SensorDataInput):
+    """
+    Submit a new data reading for a sensor.
+
+    When the ingestion queue is enabled the reading is validated and handed
+    to the group-commit writer; `data_id` is only returned when the queue
+    acknowledges after commit.
+    """
+    if not ingest_queue.enabled:
+        return await run_in_threadpool(_store_sensor_data, sensor_id, data)
+    if not sensor_cache.get(sensor_id):
+        raise HTTPException(status_code=404, detail="Sensor not found")
+    data_id = await ingest_queue.submit(
+        build_reading(sensor_id, data.value, data.timestamp)
+    )
+    if data_id is None:
+        return {"status": "queued"}
+    return {"status": "success", "data_id": data_id}
+
+
+@router.post("/sensors/data/batch")
+def receive_sensor_data_batch(batch: SensorDataBatch):
+    """
+    Submit readings for many sensors in a single transaction.
+
+    Invalid items and items of unknown sensors are rejected per item; the
+    remaining readings are inserted with one bulk statement.
+    """
+    results = {}
+    items = {}
+    for i, raw in enumerate(batch.readings):
+        try:
+            items[i] = SensorDataBatchItem.model_validate(raw)
+        except ValidationError as e:
+            detail = _validation_detail(e)
+            results[i] = {"index": i, "status": "error", "detail": detail}
+    known = sensor_cache.existing_ids(item.sensor_id for item in items.values())
+    for i, item in items.items():
+        if item.sensor_id not in known:
+            results[i] = {"index": i, "status": "error", "detail": "Sensor not found"}
+    accepted = [
+        (i, build_reading(item.sensor_id, item.value, item.timestamp))
+        for i, item in items.items()
+        if i not in results
+    ]
+    with Session(engine) as session:
+        data_ids = write_readings(session, [row for _, row in accepted])
+        session.commit()
+    dashboard_feed.notify()
+    for (i, _), data_id in zip(accepted, data_ids):
+        results[i] = {"index": i, "status": "success", "data_id": data_id}
+    return {
+        "status": "success",
+        "accepted": len(accepted),
+        "rejected": len(batch.readings) - len(accepted),
+        "results": [results[i] for i in range(len(batch.readings))],
+    }
+
+
+def _decode_line(line: bytes, line_no: int) -> str:
+    encoding = "utf-8-sig" if line_no == 1 else "utf-8"
+    return line.decode(encoding, errors="replace").rstrip("\r")
+
+
+async def _aiter_lines(chunks):
+    """Split a byte stream into numbered text lines without buffering it all."""
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, _decode_line(line, line_no)
+    if buffer:
+        yield line_no + 1, _decode_line(buffer, line_no + 1)
+
+
+async def _aiter_records(chunks, format: str):
+    header = None
+    async for line_no, line in _aiter_lines(chunks):
+        if not line.strip():
+            continue
+        if format == "ndjson":
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, e
+        elif header is None:
+            header = [h.strip() for h in next(csv.reader([line]))]
+        else:
+            row = next(csv.reader([line]))
+            yield line_no, {k: v for k, v in zip(header, row) if v != ""}
+
+
+def _write_chunk(items: list[tuple[int, SensorDataBatchItem]]):
+    """
+    Insert the items of known sensors in one transaction.
+
+    Returns:
+        `(inserted, unknown)` where `unknown` are the line numbers of items
+        whose sensor does not exist.
+    """
+    known = sensor_cache.existing_ids(item.sensor_id for _, item in items)
+    readings = [
+        build_reading(item.sensor_id, item.value, item.timestamp)
+        for _, item in items
+        if item.sensor_id in known
+    ]
+    if readings:
+        with Session(engine) as session:
+            write_readings(session, readings)
+            session.commit()
+        dashboard_feed.notify()
+    return len(readings), [line for line, item in items if item.sensor_id not in known]
+
+
+@router.post("/sensors/data/import")
+async def import_sensor_data(
+    request: Request, format: str = "ndjson", chunk_size: int = 5000
+):
+    """
+    Stream a bulk upload of historical readings.
+
+    The body is NDJSON (one `SensorDataBatchItem` object per line) or CSV
+    with a `sensor_id,timestamp,value` header. It is parsed incrementally and
+    inserted in transactions of up to `chunk_size` rows; the sensor ids of
+    each chunk are checked in the threadpool together with its insert.
+
+    Args:
+        format: `ndjson` or `csv`
+        chunk_size: Number of rows committed per transaction
+    """
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be at least 1")
+    started = time.perf_counter()
+    inserted = 0
+    rejected = 0
+    rejects = []
+
+    def reject(line_no: int, detail: str):
+        """Count a rejected line; report the first ones by line number."""
+        nonlocal rejected
+        rejected += 1
+        if len(rejects) < MAX_REPORTED_REJECTS:
+            heapq.heappush(rejects, (-line_no, detail))
+        else:
+            heapq.heappushpop(rejects, (-line_no, detail))
+
+    async def write(chunk):
+        nonlocal inserted
+        count, unknown = await run_in_threadpool(_write_chunk, chunk)
+        inserted += count
+        for line_no in unknown:
+            reject(line_no, "Sensor not found")
+
+    chunk = []
+    async for line_no, record in _aiter_records(request.stream(), format):
+        if isinstance(record, Exception):
+            reject(line_no, str(record))
+            continue
+        try:
+            item = SensorDataBatchItem.model_validate(record)
+        except ValidationError as e:
+            reject(line_no, _validation_detail(e))
+            continue
+        chunk.append((line_no, item))
+        if len(chunk) >= chunk_size:
+            await write(chunk)
+            chunk = []
+    if chunk:
+        await write(chunk)
+    elapsed = time.perf_counter() - started
+    return {
+        "status": "success",
+        "inserted": inserted,
+        "rejected": rejected,
+        "rejected_lines": [
+            {"line": -line, "detail": detail}
+            for line, detail in sorted(rejects, reverse=True)
+        ],
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(inserted / elapsed, 1) if elapsed else None,
+    }
+
+
+@router.get("/sensors/data/export")
+def export_sensor_data(
+    sensor_id: list[int] = Query(...),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    format: str = "csv",
+    gzip: bool = False,
+):
+    """
+    Stream the raw readings of one or more sensors as a file download.
+
+    Args:
+        sensor_id: ID of a sensor to export; repeat for several sensors
+        start: Filter data from this timestamp (ISO 8601)
+        end: Filter data up to this timestamp (ISO 8601)
+        format: `csv` or `parquet`
+        gzip: Compress the CSV file, or the Parquet column chunks, with gzip
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=501, detail="Parquet export requires the pyarrow package"
+        )
+    start, end = naive_utc(start), naive_utc(end)
+    sensor_ids = sorted(set(sensor_id))
+    missing = set(sensor_ids) - sensor_cache.existing_ids(sensor_ids)
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Sensor not found: {', '.join(map(str, sorted(missing)))}",
+        )
+    filename = f"sensor_data.{format}"
+    if format == "csv":
+        media_type = "text/csv"
+        if gzip:
+            filename += ".gz"
+            media_type = "application/gzip"
+    else:
+        media_type = "application/vnd.apache.parquet"
+    return StreamingResponse(
+        export_readings(sensor_ids, start, end, format, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/cache/sensors")
+def get_sensor_cache_stats():
+    """Report size and hit/miss counters of the sensor metadata cache."""
+    return sensor_cache.stats()
 
 
 @router.get("/sensors/{sensor_id}/data")
 def get_sensor_history(
     sensor_id: int,
+    response: Response,
     start: Optional[datetime] = Query(None, alias="from"),
     end: Optional[datetime] = Query(None, alias="to"),
     limit: int = 100,
+    cursor: Optional[str] = None,
+    bucket: Optional[str] = None,
+    agg: str = "avg,min,max,count,last",
 ):
     """
     Get historical data for a specific sensor.
@@ -113,19 +402,91 @@ def get_sensor_history(
         sensor_id: ID of the sensor
         start: Filter data from this timestamp (ISO 8601)
         end: Filter data up to this timestamp (ISO 8601)
-        limit: Max number of records to return
+        limit: Max number of records (or buckets) to return
+        cursor: Continue after the last reading of a previous page, using the
+            `X-Next-Cursor` header of that response. The header is absent on
+            the last page.
+        bucket: Aggregate into buckets of this width (e.g. `5m`, `1h`, `1d`)
+            and return one row per bucket instead of raw readings
+        agg: Comma-separated aggregates for bucketed results, any of
+            `avg,min,max,count,last`
     """
-    with Session(engine) as session:
-        query = select(SensorData).where(SensorData.sensor_id == sensor_id)
-        if start:
-            query = query.where(SensorData.timestamp >= start)
-        if end:
-            query = query.where(SensorData.timestamp <= end)
-        query = query.order_by(SensorData.timestamp.desc()).limit(limit)
-        results = session.exec(query).all()
+    start, end = naive_utc(start), naive_utc(end)
+    with Session(read_engine) as session:
+        if bucket:
+            bucket_seconds = parse_duration(bucket)
+            if not bucket_seconds:
+                raise HTTPException(status_code=400, detail=f"Invalid bucket: {bucket}")
+            aggs = parse_aggregates(agg)
+            if not aggs:
+                raise HTTPException(status_code=400, detail=f"Invalid agg: {agg}")
+            return bucketed_history(
+                session, sensor_id, start, end, bucket_seconds, aggs, limit
+            )
+        after = None
+        if cursor:
+            after = decode_cursor(cursor)
+            if after is None:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        results, next_cursor = history_page(
+            session, sensor_id, start, end, limit, after
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return results
 
 
+@router.get("/sensors/{sensor_id}/rollups")
+def get_sensor_rollups(
+    sensor_id: int,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    resolution: str = "auto",
+):
+    """
+    Get pre-aggregated history for a sensor.
+
+    Args:
+        sensor_id: ID of the sensor
+        start: Filter buckets from this timestamp (ISO 8601), default 24h ago
+        end: Filter buckets up to this timestamp (ISO 8601), default now
+        resolution: `1m`, `1h`, `1d`, or `auto` for the coarsest resolution
+            that still gives enough points for the range
+    """
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=24)
+    if resolution == "auto":
+        seconds = choose_resolution(start, end) or RESOLUTIONS["1m"]
+    elif resolution in RESOLUTIONS:
+        seconds = RESOLUTIONS[resolution]
+    else:
+        raise HTTPException(
+            status_code=400, detail=f"Unsupported resolution: {resolution}"
+        )
+    with Session(read_engine) as session:
+        buckets = session.exec(rollup_query(sensor_id, seconds, start, end)).all()
+    return {
+        "resolution": seconds,
+        "buckets": [
+            {
+                "bucket_start": from_epoch(b.bucket),
+                "count": b.count,
+                "min": b.min,
+                "max": b.max,
+                "avg": b.sum / b.count,
+                "last": b.last,
+            }
+            for b in buckets
+        ],
+    }
+
+
+@router.get("/alerts/counts")
+def get_alert_counts():
+    """Open alert counts in total, per type, per parcel and per sensor."""
+    return alert_counters.counts()
+
+
 @router.post("/alerts/{alert_id}/acknowledge")
 def acknowledge_alert(alert_id: int):
     """
@@ -134,13 +495,35 @@ def acknowledge_alert(alert_id: int):
     Args:
         alert_id: ID of the alert to acknowledge
     """
-    with Session(engine) as session:
-        from app.models import Alert
-
-        alert = session.get(Alert, alert_id)
-        if not alert:
+    with Session(read_engine) as session:
+        if session.get(Alert, alert_id) is None:
             raise HTTPException(status_code=404, detail="Alert not found")
-        alert.acknowledged = True
-        session.add(alert)
-        session.commit()
-        return {"status": "success", "message": "Alert acknowledged"}
\ No newline at end of file
+    acknowledge_alerts(alert_ids=[alert_id])
+    return {"status": "success", "message": "Alert acknowledged"}
+
+
+@router.post("/alerts/acknowledge")
+def acknowledge_alerts_bulk(request: AlertAcknowledge):
+    """
+    Acknowledge many open alerts with a single update.
+
+    Alerts must match every given criterion; `all` must be set to
+    acknowledge every open alert without any criterion.
+    """
+    criteria = (
+        request.alert_ids,
+        request.sensor_id,
+        request.parcel_id,
+        request.type,
+    )
+    if all(c is None for c in criteria) and not request.all:
+        raise HTTPException(
+            status_code=400,
+            detail="Give alert_ids, sensor_id, parcel_id or type, or set all",
+        )
+    if request.type is not None and request.type not in ("HIGH", "LOW"):
+        raise HTTPException(status_code=400, detail=f"Invalid type: {request.type}")
+    alert_ids = acknowledge_alerts(
+        request.alert_ids, request.sensor_id, request.parcel_id, request.type
+    )
+    return {"status": "success", "acknowledged": len(alert_ids), "alert_ids": alert_ids}
@@ -12,6 +12,16 @@ from app.pages.parcel_detail import parcel_detail_page
 from app.pages.sensor_detail import sensor_detail_page
 from app.pages.alerts import alerts_page
 from app.api.routes import router as api_router
+from sqlmodel import Session
+from app.utils import engine, ensure_indexes, seed_database
+from app.ingest import ensure_sensor_latest
+from app.rollups import ensure_rollups
+from app.sensor_cache import sensor_cache
+from app.alert_counters import alert_counters
+from app.dashboard_feed import dashboard_feed
+from app.ingest_queue import ingest_queue
+from app.retention import retention_job
+from app.archive import archive_job
 
 
 def login_page() -> rx.Component:
@@ -27,6 +37,17 @@ def index() -> rx.Component:
     return rx.el.div(rx.script("window.location.href = '/dashboard'"))
 
 
+def warm_caches():
+    """Create the schema if needed and load in-memory caches at startup."""
+    seed_database()
+    ensure_indexes()
+    sensor_cache.load()
+    alert_counters.load()
+    with Session(engine) as session:
+        ensure_sensor_latest(session)
+        ensure_rollups(session)
+
+
 def api_routes(api_app):
     for route in api_router.routes:
         path = f"{api_router.prefix}{route.path}"
@@ -46,6 +67,12 @@ app = rx.App(
     ],
     api_transformer=api_routes,
 )
+app.register_lifespan_task(warm_caches)
+app.register_lifespan_task(dashboard_feed.start)
+app.register_lifespan_task(alert_counters.start)
+app.register_lifespan_task(archive_job.start)
+app.register_lifespan_task(retention_job.start)
+app.register_lifespan_task(ingest_queue.lifespan)
 app.add_page(index, route="/")
 app.add_page(
     login_page,
@@ -85,5 +112,5 @@ app.add_page(
     alerts_page,
     route="/alerts",
     title="Alerts - Agrotech",
-    on_load=[AuthState.ensure_db_seeded, AlertState.load_alerts],
+    on_load=[AuthState.ensure_db_seeded, AlertState.first_page],
 )
\ No newline at end of file
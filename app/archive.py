@@ -0,0 +1,322 @@
+import asyncio
+import logging
+import os
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlmodel import Session, select
+from app.partitions import month_start, next_month, partitions
+from app.utils import read_engine
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pc = None
+    pq = None
+
+ARCHIVE_COLUMNS = ("id", "sensor_id", "timestamp", "value", "raw")
+
+ArchivedReading = namedtuple("ArchivedReading", ARCHIVE_COLUMNS)
+
+
+def _schema():
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("sensor_id", pa.int64()),
+            ("timestamp", pa.timestamp("us")),
+            ("value", pa.float64()),
+            ("raw", pa.string()),
+        ]
+    )
+
+
+class Archive:
+    """
+    Cold storage for raw readings in per-sensor, per-month Parquet files.
+
+    Files live at `<root>/sensor_<id>/<YYYY-MM>.parquet`. Only raw readings
+    are archived: the rollups stay in SQLite, so long-range charts never
+    touch the archive. Readers in app/history.py and app/export.py merge
+    archived rows with the live table whenever a range overlaps an archived
+    month; files are opened memory-mapped and only the requested columns
+    and row groups are read.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _sensor_dir(self, sensor_id: int) -> str:
+        return os.path.join(self.root, f"sensor_{sensor_id}")
+
+    def path(self, sensor_id: int, month: datetime) -> str:
+        return os.path.join(self._sensor_dir(sensor_id), f"{month:%Y-%m}.parquet")
+
+    def months(self, sensor_id: int) -> list[datetime]:
+        """Archived months of a sensor, oldest first."""
+        try:
+            names = os.listdir(self._sensor_dir(sensor_id))
+        except FileNotFoundError:
+            return []
+        return sorted(
+            datetime.strptime(name[: -len(".parquet")], "%Y-%m")
+            for name in names
+            if name.endswith(".parquet")
+        )
+
+    def overlapping(self, sensor_id: int, start=None, end=None) -> list[datetime]:
+        return [
+            month
+            for month in self.months(sensor_id)
+            if (end is None or month <= end)
+            and (start is None or next_month(month) > start)
+        ]
+
+    def overlaps(self, sensor_id: int, start=None, end=None) -> bool:
+        return bool(self.overlapping(sensor_id, start, end))
+
+    def prune(self, cutoff: datetime) -> tuple[int, int]:
+        """
+        Delete the files of months that ended before `cutoff`.
+
+        Returns:
+            `(files, bytes)` deleted.
+        """
+        files = size = 0
+        try:
+            sensor_dirs = os.listdir(self.root)
+        except FileNotFoundError:
+            return 0, 0
+        for name in sensor_dirs:
+            if not name.startswith("sensor_"):
+                continue
+            sensor_id = int(name[len("sensor_") :])
+            for month in self.months(sensor_id):
+                if next_month(month) > cutoff:
+                    break
+                path = self.path(sensor_id, month)
+                size += os.path.getsize(path)
+                os.remove(path)
+                files += 1
+            if not os.listdir(self._sensor_dir(sensor_id)):
+                os.rmdir(self._sensor_dir(sensor_id))
+        return files, size
+
+    def read_month(
+        self, sensor_id: int, month: datetime, start=None, end=None, columns=None
+    ):
+        """One archived month as a table sorted by `(timestamp, id)`."""
+        if pq is None:
+            raise RuntimeError("Reading the archive requires the pyarrow package")
+        filters = []
+        if start:
+            filters.append(("timestamp", ">=", start))
+        if end:
+            filters.append(("timestamp", "<=", end))
+        table = pq.read_table(
+            self.path(sensor_id, month),
+            columns=list(columns or ARCHIVE_COLUMNS),
+            filters=filters or None,
+            memory_map=True,
+        )
+        order = [("timestamp", "ascending")]
+        if "id" in table.column_names:
+            order.append(("id", "ascending"))
+        return table.sort_by(order)
+
+    def read_points(self, sensor_id: int, start=None, end=None) -> list[tuple]:
+        """Archived `(timestamp, value)` pairs in time order."""
+        points = []
+        for month in self.overlapping(sensor_id, start, end):
+            table = self.read_month(
+                sensor_id, month, start, end, ("timestamp", "value", "id")
+            )
+            points.extend(
+                zip(table["timestamp"].to_pylist(), table["value"].to_pylist())
+            )
+        return points
+
+    def read_arrays(self, sensor_id: int, month: datetime, start=None, end=None):
+        """
+        One archived month as NumPy arrays `(seconds, values)` in time
+        order, seconds being Unix time with microseconds.
+        """
+        table = self.read_month(
+            sensor_id, month, start, end, ("timestamp", "value", "id")
+        )
+        micros = pc.cast(table["timestamp"], pa.int64()).to_numpy()
+        return micros / 1e6, table["value"].to_numpy()
+
+    def iter_rows(
+        self, sensor_id: int, start=None, end=None, descending=False, batch_size=1024
+    ):
+        """
+        Yield `ArchivedReading`s ordered by `(timestamp, id)`. Only
+        `batch_size` rows at a time are turned into Python objects.
+        """
+        months = self.overlapping(sensor_id, start, end)
+        for month in reversed(months) if descending else months:
+            table = self.read_month(sensor_id, month, start, end)
+            offsets = range(0, table.num_rows, batch_size)
+            for offset in reversed(offsets) if descending else offsets:
+                batch = table.slice(offset, batch_size)
+                rows = zip(*(batch[c].to_pylist() for c in ARCHIVE_COLUMNS))
+                rows = list(map(ArchivedReading._make, rows))
+                yield from reversed(rows) if descending else rows
+
+    def write_month(
+        self, session, sensor_id: int, month: datetime, batch_size: int
+    ) -> tuple[int, int]:
+        """
+        Append a month of live readings to its Parquet file.
+
+        The file is written next to the old one and swapped in atomically.
+        Rows already in the old file (from an interrupted run) are skipped,
+        and nothing is written for a month without live readings.
+
+        Returns:
+            `(count, max_id)` of the rows read from the live tables.
+        """
+        path = self.path(sensor_id, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        existing = pq.read_table(path) if os.path.exists(path) else None
+        source = partitions.readings(
+            session, sensor_id, start=month, before=next_month(month)
+        )
+        query = (
+            select(*(source.c[c] for c in ARCHIVE_COLUMNS))
+            .order_by(source.c.timestamp.asc(), source.c.id.asc())
+            .execution_options(stream_results=True, yield_per=batch_size)
+        )
+        schema = _schema()
+        count = max_id = 0
+        tmp_path = f"{path}.tmp"
+        with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+            for rows in session.execute(query).partitions():
+                batch = pa.Table.from_arrays(list(zip(*rows)), schema=schema)
+                if existing is not None:
+                    keep = pc.invert(pc.is_in(existing["id"], value_set=batch["id"]))
+                    existing = existing.filter(keep)
+                writer.write_table(batch)
+                count += len(rows)
+                max_id = max(max_id, pc.max(batch["id"]).as_py())
+            if existing is not None and existing.num_rows:
+                writer.write_table(existing.cast(schema))
+        if count:
+            os.replace(tmp_path, path)
+        else:
+            os.remove(tmp_path)
+        return count, max_id
+
+
+class ArchiveJob:
+    """
+    Moves raw readings of whole months older than `after_days` from the
+    live tables into the archive. 0 disables archiving.
+    """
+
+    def __init__(self, archive: Archive, after_days, interval_hours, chunk_size):
+        self.archive = archive
+        self.after_days = after_days
+        self.interval_hours = interval_hours
+        self.chunk_size = chunk_size
+        self.last_report: dict | None = None
+        self._task = None
+
+    def enabled(self) -> bool:
+        return bool(self.after_days) and pa is not None
+
+    def _pending_months(self, cutoff: datetime) -> dict[datetime, list[int]]:
+        """Sensors with live readings in each complete month before `cutoff`."""
+        with Session(read_engine) as session:
+            readings = partitions.readings(session, before=cutoff)
+            oldest = session.execute(
+                select(readings.c.sensor_id, func.min(readings.c.timestamp)).group_by(
+                    readings.c.sensor_id
+                )
+            ).all()
+        pending = {}
+        for sensor_id, first in oldest:
+            month = month_start(first)
+            while next_month(month) <= cutoff:
+                pending.setdefault(month, []).append(sensor_id)
+                month = next_month(month)
+        return dict(sorted(pending.items()))
+
+    def run(self, now: datetime | None = None) -> dict:
+        """
+        Archive every complete month older than the cutoff.
+
+        Months are processed one at a time: every sensor's file is written
+        first, then each sensor's rows up to the last id written are
+        removed, by dropping the month's partition when nothing else is
+        left in it. Rows that arrive for the month meanwhile have newer ids,
+        are kept, and are archived on a later run.
+        """
+        if pa is None:
+            raise RuntimeError("Archiving requires the pyarrow package")
+        now = now or datetime.utcnow()
+        started = time.perf_counter()
+        cutoff = month_start(now - timedelta(days=self.after_days))
+        archived = months = 0
+        for month, sensor_ids in self._pending_months(cutoff).items():
+            written = {}
+            for sensor_id in sensor_ids:
+                with Session(read_engine) as session:
+                    count, max_id = self.archive.write_month(
+                        session, sensor_id, month, self.chunk_size
+                    )
+                if count:
+                    written[sensor_id] = max_id
+                    archived += count
+                    months += 1
+            if not written:
+                continue
+            partitions.drop_if_archived(month, written)
+            for sensor_id, max_id in written.items():
+                partitions.delete_readings(
+                    sensor_id,
+                    self.chunk_size,
+                    start=month,
+                    before=next_month(month),
+                    max_id=max_id,
+                )
+        report = {
+            "archived": archived,
+            "months": months,
+            "before": cutoff,
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+        }
+        self.last_report = report
+        return report
+
+    def start(self):
+        """Start the periodic archive task if archiving is configured."""
+        if self.after_days and pa is None:
+            logging.warning("ARCHIVE_AFTER_DAYS is set but pyarrow is not installed")
+        if not self.enabled() or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                report = await asyncio.to_thread(self.run)
+                logging.info(f"Archive: {report}")
+            except Exception as e:
+                logging.exception(f"Error archiving readings: {e}")
+            await asyncio.sleep(self.interval_hours * 3600)
+
+
+archive = Archive(os.environ.get("ARCHIVE_DIR", "archive"))
+
+archive_job = ArchiveJob(
+    archive,
+    after_days=int(os.environ.get("ARCHIVE_AFTER_DAYS", "0")),
+    interval_hours=float(os.environ.get("ARCHIVE_INTERVAL_HOURS", "24")),
+    chunk_size=int(os.environ.get("ARCHIVE_CHUNK_SIZE", "5000")),
+)
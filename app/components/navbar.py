@@ -1,5 +1,6 @@
 import reflex as rx
 from app.states.auth_state import AuthState
+from app.states.alert_state import AlertState
 from app.components.styles import M3Styles
 
 
@@ -31,8 +32,15 @@ def navbar() -> rx.Component:
                     ),
                     rx.el.a(
                         "Alerts",
+                        rx.cond(
+                            AlertState.open_alert_count > 0,
+                            rx.el.span(
+                                AlertState.open_alert_count.to_string(),
+                                class_name="ml-1.5 text-xs font-bold text-white bg-red-500 px-1.5 py-0.5 rounded-full",
+                            ),
+                        ),
                         href="/alerts",
-                        class_name="text-sm font-medium text-slate-600 hover:text-blue-600 transition-colors",
+                        class_name="flex items-center text-sm font-medium text-slate-600 hover:text-blue-600 transition-colors",
                     ),
                     class_name="hidden md:flex items-center gap-6 ml-8",
                 ),
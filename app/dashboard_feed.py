@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from sqlmodel import select, func, Session
+from app.models import Parcel, Sensor, SensorLatest, Alert
+from app.utils import read_engine
+from app.alert_counters import alert_counters
+
+
+def _time_since(timestamp: datetime) -> float:
+    return (datetime.utcnow() - timestamp).total_seconds()
+
+
+SNAPSHOT_QUERIES = 3
+
+
+def counts_query():
+    return select(func.count(Parcel.id).label("total_parcels"))
+
+
+def sensor_status_query():
+    return (
+        select(
+            Sensor.id,
+            Sensor.id_code,
+            Sensor.type,
+            Sensor.unit,
+            Sensor.parcel_id,
+            SensorLatest.timestamp,
+            SensorLatest.value,
+            SensorLatest.status,
+        )
+        .outerjoin(SensorLatest, SensorLatest.sensor_id == Sensor.id)
+        .order_by(Sensor.id)
+    )
+
+
+def top_alerts_query(limit: int = 5):
+    return (
+        select(Alert.id, Alert.type, Alert.message, Alert.timestamp, Sensor.id_code)
+        .outerjoin(Sensor, Sensor.id == Alert.sensor_id)
+        .where(Alert.acknowledged == False)
+        .order_by(Alert.timestamp.desc())
+        .limit(limit)
+    )
+
+
+def compute_snapshot(engine=read_engine) -> dict:
+    """
+    Build the dashboard view shared by every connected client.
+
+    Runs `SNAPSHOT_QUERIES` statements however many sensors and alerts
+    there are: the parcel count, every sensor joined to its latest reading,
+    and the newest open alerts joined to their sensor codes. The open alert
+    count comes from `alert_counters`.
+    """
+    with Session(engine) as session:
+        counts = session.execute(counts_query()).one()
+        sensors = session.execute(sensor_status_query()).all()
+        alerts = session.execute(top_alerts_query()).all()
+    status_list = []
+    for sensor in sensors:
+        status = "gray"
+        value_display = "--"
+        last_update = "Never"
+        if sensor.timestamp:
+            value_display = f"{sensor.value:.1f}"
+            status = sensor.status
+            seconds = _time_since(sensor.timestamp)
+            if seconds < 60:
+                last_update = "Just now"
+            elif seconds < 3600:
+                last_update = f"{int(seconds / 60)}m ago"
+            else:
+                last_update = f"{int(seconds / 3600)}h ago"
+        status_list.append(
+            {
+                "id": sensor.id,
+                "code": sensor.id_code,
+                "type": sensor.type,
+                "value": value_display,
+                "unit": sensor.unit,
+                "status": status,
+                "last_update": last_update,
+                "parcel_id": sensor.parcel_id,
+            }
+        )
+    alerts_display = []
+    for a in alerts:
+        seconds = _time_since(a.timestamp)
+        if seconds < 3600:
+            time_ago = f"{int(seconds / 60)}m ago"
+        elif seconds < 86400:
+            time_ago = f"{int(seconds / 3600)}h ago"
+        else:
+            time_ago = f"{int(seconds / 86400)}d ago"
+        alerts_display.append(
+            {
+                "id": a.id,
+                "sensor_code": a.id_code or "Unknown",
+                "type": a.type,
+                "message": a.message,
+                "time_ago": time_ago,
+            }
+        )
+    return {
+        "total_sensors": len(sensors),
+        "total_parcels": counts.total_parcels,
+        "sensor_statuses": status_list,
+        "active_alerts": alert_counters.total(),
+        "active_alerts_list": alerts_display,
+    }
+
+
+class DashboardFeed:
+    """
+    Server-wide dashboard snapshot with publish/subscribe fan-out.
+
+    A single background task recomputes the snapshot every `interval`
+    seconds, or sooner (but at most once per `min_interval`) after
+    `notify` is called by the ingest and acknowledge paths. Dashboard
+    states wait on `wait_for_update` instead of querying the database, so
+    database load does not grow with the number of viewers.
+    """
+
+    def __init__(self, interval: float, min_interval: float):
+        self.interval = interval
+        self.min_interval = min_interval
+        self.version = 0
+        self.snapshot: dict | None = None
+        self.published_at = 0.0
+        self._loop = None
+        self._published = None
+        self._wake = None
+        self._task = None
+        self._cards: dict[int, dict] = {}
+        self._card_versions: dict[int, int] = {}
+
+    def _version_cards(self, snapshot: dict):
+        """Bump the version of every sensor card that differs from last time."""
+        cards = {card["id"]: card for card in snapshot["sensor_statuses"]}
+        for sensor_id, card in cards.items():
+            if self._cards.get(sensor_id) != card:
+                self._card_versions[sensor_id] = (
+                    self._card_versions.get(sensor_id, 0) + 1
+                )
+        self._cards = cards
+        self._card_versions = {
+            sensor_id: self._card_versions[sensor_id] for sensor_id in cards
+        }
+        snapshot["sensor_versions"] = dict(self._card_versions)
+
+    def _publish(self, snapshot: dict):
+        self._version_cards(snapshot)
+        self.snapshot = snapshot
+        self.published_at = time.monotonic()
+        self.version += 1
+        if self._published is not None:
+            self._published.set()
+            self._published = asyncio.Event()
+
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def current(self) -> dict:
+        """Return the latest snapshot, computing one if it is missing or stale."""
+        stale = time.monotonic() - self.published_at > self.interval
+        if self.snapshot is None or (stale and not self.running()):
+            self.refresh()
+        return self.snapshot
+
+    def refresh(self) -> dict:
+        """Recompute and publish synchronously, e.g. right after a user action."""
+        snapshot = compute_snapshot()
+        if self._loop is not None and not self._in_loop():
+            self._loop.call_soon_threadsafe(self._publish, snapshot)
+        else:
+            self._publish(snapshot)
+        return snapshot
+
+    def _in_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def notify(self):
+        """Request an early refresh; safe to call from any thread."""
+        if self._loop is None:
+            return
+        if self._in_loop():
+            self._wake.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def start(self):
+        """Start the refresh task on the running event loop if needed."""
+        if self.running():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._published = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def wait_for_update(self, since_version: int, timeout: float = 30.0):
+        """Wait for a snapshot newer than `since_version`."""
+        self.start()
+        if self.version <= since_version:
+            try:
+                await asyncio.wait_for(self._published.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.version, self.current()
+
+    async def _run(self):
+        while True:
+            try:
+                self._publish(await asyncio.to_thread(compute_snapshot))
+            except Exception as e:
+                logging.exception(f"Error computing dashboard snapshot: {e}")
+            await asyncio.sleep(self.min_interval)
+            try:
+                await asyncio.wait_for(
+                    self._wake.wait(), max(self.interval - self.min_interval, 0)
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+dashboard_feed = DashboardFeed(
+    interval=float(os.environ.get("DASHBOARD_REFRESH_SECONDS", "5")),
+    min_interval=float(os.environ.get("DASHBOARD_MIN_REFRESH_SECONDS", "1")),
+)
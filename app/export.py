@@ -0,0 +1,147 @@
+import csv
+import heapq
+import io
+import zlib
+from itertools import islice
+from sqlmodel import Session, select
+from app.archive import archive
+from app.history import history_source
+from app.utils import read_engine
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = ("csv", "parquet")
+EXPORT_COLUMNS = ("id", "sensor_id", "timestamp", "value", "raw")
+EXPORT_BATCH_SIZE = 10000
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def _export_batches(sensor_ids, start, end, batch_size):
+    """
+    Yield lists of reading rows, sensor by sensor in timestamp order.
+
+    Each sensor is read with a range scan on the `(sensor_id, timestamp)`
+    index of every partition in range, `batch_size` rows at a time, so
+    memory use does not depend on the size of the range. Archived months
+    are merged in one month file at a time.
+    """
+    with Session(read_engine) as session:
+        for sensor_id in sensor_ids:
+            source = history_source(session, sensor_id, start, end)
+            query = (
+                select(*(source.c[c] for c in EXPORT_COLUMNS))
+                .order_by(source.c.timestamp.asc(), source.c.id.asc())
+                .execution_options(stream_results=True, yield_per=batch_size)
+            )
+            result = session.execute(query)
+            if not archive.overlaps(sensor_id, start, end):
+                yield from result.partitions()
+                continue
+            rows = heapq.merge(
+                archive.iter_rows(sensor_id, start, end),
+                result,
+                key=lambda row: (row.timestamp, row.id),
+            )
+            while batch := list(islice(rows, batch_size)):
+                yield batch
+
+
+def _csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in batches:
+        writer.writerows(
+            (row.id, row.sensor_id, row.timestamp.isoformat(), row.value, row.raw)
+            for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file whose contents are taken out as they are written."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_chunks(batches, compression):
+    schema = pa.schema(
+        [
+            ("id", pa.int64()),
+            ("sensor_id", pa.int64()),
+            ("timestamp", pa.timestamp("us")),
+            ("value", pa.float64()),
+            ("raw", pa.string()),
+        ]
+    )
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression=compression) as writer:
+        for rows in batches:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            chunk = sink.take()
+            if chunk:
+                yield chunk
+    yield sink.take()
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_readings(
+    sensor_ids,
+    start=None,
+    end=None,
+    format: str = "csv",
+    gzip: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE,
+):
+    """
+    Generate an export of raw readings as byte chunks.
+
+    Rows are filtered like `GET /api/sensors/{id}/data` and ordered by
+    sensor, then time. CSV can be gzip-compressed as a whole; Parquet (which
+    needs the optional `pyarrow` package) compresses its column chunks with
+    gzip instead, so the file stays readable by Parquet tools.
+    """
+    batches = _export_batches(sensor_ids, start, end, batch_size)
+    if format == "parquet":
+        return _parquet_chunks(batches, "gzip" if gzip else "snappy")
+    chunks = _csv_chunks(batches)
+    return _gzip_chunks(chunks) if gzip else chunks
@@ -0,0 +1,469 @@
+import base64
+import heapq
+import math
+import re
+from datetime import datetime
+from itertools import islice
+import numpy as np
+from sqlalchemy import Integer, case, cast, func, literal, tuple_
+from sqlmodel import select
+from app.archive import archive
+from app.models import SensorData, SensorRollup
+from app.partitions import next_month, partitions
+from app.retention import retention_job
+from app.rollups import RESOLUTIONS, from_epoch, to_epoch
+
+AGGREGATES = ("avg", "min", "max", "count", "last")
+DURATION = re.compile(r"^(\d+)([smhd])$")
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+JULIAN_UNIX_EPOCH = 2440587.5 * 86400
+EMPTY_STATS = {
+    "count": 0,
+    "min": 0.0,
+    "max": 0.0,
+    "avg": 0.0,
+    "stddev": 0.0,
+    "p50": 0.0,
+    "p95": 0.0,
+    "time_in_range": 0.0,
+}
+
+
+def parse_duration(value: str) -> int | None:
+    """Parse `30s`, `5m`, `1h` or `1d` into seconds."""
+    match = DURATION.match(value.strip())
+    if not match or int(match.group(1)) == 0:
+        return None
+    return int(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def parse_aggregates(value: str) -> list[str] | None:
+    aggs = [a.strip() for a in value.split(",") if a.strip()]
+    if not aggs or any(a not in AGGREGATES for a in aggs):
+        return None
+    return aggs
+
+
+def history_source(session, sensor_id: int, start=None, end=None):
+    """
+    Raw readings of a sensor, filtered like `GET /api/sensors/{id}/data`, as
+    a subquery over the partitions that cover the range.
+    """
+    return partitions.readings(session, sensor_id, start, end)
+
+
+def encode_cursor(timestamp: datetime, data_id: int) -> str:
+    """Opaque cursor pointing just past the reading `(timestamp, data_id)`."""
+    raw = f"{timestamp.isoformat()}|{data_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int] | None:
+    """Inverse of `encode_cursor`; returns None for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, data_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), int(data_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def history_page_query(session, sensor_id: int, start, end, limit: int, cursor=None):
+    """Live readings after `cursor`, newest first; see `history_page`."""
+    source = history_source(session, sensor_id, start, end)
+    query = select(source)
+    if cursor:
+        query = query.where(tuple_(source.c.timestamp, source.c.id) < tuple_(*cursor))
+    return query.order_by(source.c.timestamp.desc(), source.c.id.desc()).limit(limit)
+
+
+def history_page(session, sensor_id: int, start, end, limit: int, cursor=None):
+    """
+    One page of raw readings, newest first, using keyset pagination.
+
+    Readings are ordered by `(timestamp, id)` descending and the page starts
+    after the `(timestamp, id)` decoded from `cursor`, so every page is a
+    range seek on the `(sensor_id, timestamp)` index however deep it is.
+
+    Returns:
+        `(readings, next_cursor)`; `next_cursor` is None on the last page.
+    """
+    upper = end
+    if cursor and (upper is None or cursor[0] < upper):
+        upper = cursor[0]
+    query = history_page_query(session, sensor_id, start, upper, limit + 1, cursor)
+    readings = [SensorData(**row._mapping) for row in session.execute(query)]
+    months = archive.overlapping(sensor_id, start, upper)
+    if months and (
+        len(readings) <= limit or readings[-1].timestamp < next_month(months[-1])
+    ):
+        archived = (
+            SensorData(**row._asdict())
+            for row in archive.iter_rows(sensor_id, start, upper, descending=True)
+            if not cursor or (row.timestamp, row.id) < cursor
+        )
+        readings = list(
+            islice(
+                heapq.merge(
+                    readings,
+                    islice(archived, limit + 1),
+                    key=lambda r: (r.timestamp, r.id),
+                    reverse=True,
+                ),
+                limit + 1,
+            )
+        )
+    if len(readings) <= limit:
+        return readings, None
+    readings = readings[:limit]
+    last = readings[-1]
+    return readings, encode_cursor(last.timestamp, last.id)
+
+
+def history_points_query(session, sensor_id: int, start=None, end=None):
+    source = history_source(session, sensor_id, start, end)
+    return select(source.c.timestamp, source.c.value).order_by(
+        source.c.timestamp.asc(), source.c.id.asc()
+    )
+
+
+def history_points(session, sensor_id: int, start=None, end=None) -> list[tuple]:
+    """`(timestamp, value)` pairs in time order, live and archived."""
+    query = history_points_query(session, sensor_id, start, end)
+    points = session.execute(query).all()
+    if not archive.overlaps(sensor_id, start, end):
+        return points
+    archived = archive.read_points(sensor_id, start, end)
+    return list(heapq.merge(archived, points, key=lambda p: p[0]))
+
+
+def _seconds(timestamp: datetime) -> float:
+    return to_epoch(timestamp) + timestamp.microsecond / 1e6
+
+
+def _rollup_resolution(bucket_seconds: int, start, end) -> int | None:
+    """
+    Largest rollup resolution that tiles the buckets and the range exactly
+    and that retention still keeps for the whole range.
+    """
+    for resolution in sorted(RESOLUTIONS.values(), reverse=True):
+        if bucket_seconds % resolution:
+            continue
+        kept_since = retention_job.rollups_kept_since(resolution)
+        if kept_since and (start is None or start < kept_since):
+            continue
+        if start and to_epoch(start) % resolution:
+            continue
+        if end and (to_epoch(end) + 1) % resolution:
+            continue
+        return resolution
+    return None
+
+
+def _raw_source(session, sensor_id, start, end, bucket_seconds):
+    readings = history_source(session, sensor_id, start, end)
+    epoch = cast(func.strftime("%s", readings.c.timestamp), Integer)
+    bucket = (epoch // bucket_seconds) * bucket_seconds
+    query = select(
+        bucket.label("bucket"),
+        literal(1).label("count"),
+        readings.c.value.label("sum"),
+        readings.c.value.label("min"),
+        readings.c.value.label("max"),
+        readings.c.value.label("last"),
+        readings.c.timestamp.label("last_timestamp"),
+        func.row_number()
+        .over(
+            partition_by=bucket,
+            order_by=(readings.c.timestamp.desc(), readings.c.id.desc()),
+        )
+        .label("rn"),
+    )
+    return query.subquery()
+
+
+def _rollup_source(sensor_id, start, end, bucket_seconds, resolution):
+    bucket = (SensorRollup.bucket // bucket_seconds) * bucket_seconds
+    query = select(
+        bucket.label("bucket"),
+        SensorRollup.count.label("count"),
+        SensorRollup.sum.label("sum"),
+        SensorRollup.min.label("min"),
+        SensorRollup.max.label("max"),
+        SensorRollup.last.label("last"),
+        func.row_number()
+        .over(partition_by=bucket, order_by=SensorRollup.last_timestamp.desc())
+        .label("rn"),
+    ).where(
+        SensorRollup.sensor_id == sensor_id, SensorRollup.resolution == resolution
+    )
+    if start:
+        query = query.where(SensorRollup.bucket >= to_epoch(start))
+    if end:
+        query = query.where(SensorRollup.bucket <= to_epoch(end))
+    return query.subquery()
+
+
+def _bucket_columns(source) -> dict:
+    return {
+        "avg": func.sum(source.c.sum) / func.sum(source.c.count),
+        "min": func.min(source.c.min),
+        "max": func.max(source.c.max),
+        "count": func.sum(source.c.count),
+        "last": func.max(case((source.c.rn == 1, source.c.last))),
+    }
+
+
+def bucketed_history(session, sensor_id, start, end, bucket_seconds, aggs, limit):
+    """
+    Aggregate a sensor's readings into fixed-width time buckets in SQL.
+
+    Rollups are used when a rollup resolution divides the bucket width,
+    the requested range is aligned to it and retention has not pruned
+    rollups of that resolution in the range; otherwise raw readings are
+    grouped. When the range reaches into the archive, the live buckets are
+    merged with buckets computed per archived month in NumPy. Buckets are
+    returned newest first, like the raw history.
+    """
+    resolution = _rollup_resolution(bucket_seconds, start, end)
+    if resolution:
+        source = _rollup_source(sensor_id, start, end, bucket_seconds, resolution)
+    else:
+        source = _raw_source(session, sensor_id, start, end, bucket_seconds)
+        if archive.overlaps(sensor_id, start, end):
+            return _merged_buckets(
+                session, source, sensor_id, start, end, bucket_seconds, aggs, limit
+            )
+    columns = _bucket_columns(source)
+    query = (
+        select(source.c.bucket, *[columns[a].label(a) for a in aggs])
+        .group_by(source.c.bucket)
+        .order_by(source.c.bucket.desc())
+        .limit(limit)
+    )
+    return [
+        {"bucket_start": from_epoch(row.bucket), **{a: row._mapping[a] for a in aggs}}
+        for row in session.execute(query)
+    ]
+
+
+def _array_buckets(seconds, values, bucket_seconds) -> dict:
+    """Partial buckets `{bucket: [count, sum, min, max, last, last_t]}`."""
+    if not len(values):
+        return {}
+    buckets = seconds.astype(np.int64) // bucket_seconds * bucket_seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(values)] - 1
+    columns = zip(
+        buckets[starts].tolist(),
+        (ends - starts + 1).tolist(),
+        np.add.reduceat(values, starts).tolist(),
+        np.minimum.reduceat(values, starts).tolist(),
+        np.maximum.reduceat(values, starts).tolist(),
+        values[ends].tolist(),
+        seconds[ends].tolist(),
+    )
+    return {bucket: list(partial) for bucket, *partial in columns}
+
+
+def _merge_buckets(merged: dict, partials: dict):
+    for bucket, (count, total, low, high, last, last_t) in partials.items():
+        current = merged.get(bucket)
+        if current is None:
+            merged[bucket] = [count, total, low, high, last, last_t]
+            continue
+        current[0] += count
+        current[1] += total
+        current[2] = min(current[2], low)
+        current[3] = max(current[3], high)
+        if last_t >= current[5]:
+            current[4], current[5] = last, last_t
+
+
+def _merged_buckets(
+    session, source, sensor_id, start, end, bucket_seconds, aggs, limit
+):
+    """`bucketed_history` over live buckets plus per-month archived buckets."""
+    columns = _bucket_columns(source)
+    last_t = func.max(source.c.last_timestamp)
+    live = select(
+        source.c.bucket,
+        columns["count"],
+        func.sum(source.c.sum),
+        columns["min"],
+        columns["max"],
+        columns["last"],
+        last_t,
+    ).group_by(source.c.bucket)
+    merged = {
+        bucket: [count, total, low, high, last, _seconds(last_timestamp)]
+        for bucket, count, total, low, high, last, last_timestamp in session.execute(
+            live
+        )
+    }
+    for month in archive.overlapping(sensor_id, start, end):
+        seconds, values = archive.read_arrays(sensor_id, month, start, end)
+        _merge_buckets(merged, _array_buckets(seconds, values, bucket_seconds))
+    rows = []
+    for bucket in sorted(merged, reverse=True)[:limit]:
+        count, total, low, high, last, _ = merged[bucket]
+        columns = {
+            "avg": total / count,
+            "min": low,
+            "max": high,
+            "count": count,
+            "last": last,
+        }
+        rows.append(
+            {"bucket_start": from_epoch(bucket), **{a: columns[a] for a in aggs}}
+        )
+    return rows
+
+
+def history_stats_query(session, sensor, start=None, end=None):
+    """
+    One aggregate query over a sensor's readings; see `history_stats`.
+
+    Percentiles use the nearest-rank definition. The in-range time weights
+    each reading by the gap to the next one.
+    """
+    source = history_source(session, sensor.id, start, end)
+    seconds = func.julianday(source.c.timestamp) * 86400
+    readings = select(
+        source.c.value.label("value"),
+        seconds.label("t"),
+        func.lead(seconds).over(order_by=source.c.timestamp).label("next_t"),
+        func.cume_dist().over(order_by=source.c.value).label("cd"),
+    ).subquery()
+    value = readings.c.value
+    duration = readings.c.next_t - readings.c.t
+    in_range = (value >= sensor.threshold_low) & (value <= sensor.threshold_high)
+    return select(
+        func.count(value).label("count"),
+        func.min(value).label("min"),
+        func.max(value).label("max"),
+        func.avg(value).label("avg"),
+        func.avg(value * value).label("avg_sq"),
+        func.min(case((readings.c.cd >= 0.5, value))).label("p50"),
+        func.min(case((readings.c.cd >= 0.95, value))).label("p95"),
+        func.sum(duration).label("duration"),
+        func.sum(case((in_range, duration), else_=0)).label("in_range"),
+        func.min(readings.c.t).label("first_t"),
+        func.max(readings.c.t).label("last_t"),
+        func.max(case((readings.c.next_t.is_(None) & in_range, 1), else_=0)).label(
+            "last_in_range"
+        ),
+    )
+
+
+def _array_partial(sensor, seconds, values) -> dict:
+    """Mergeable statistics of one archived month, see `_merged_stats`."""
+    durations = np.diff(seconds)
+    in_range = (values >= sensor.threshold_low) & (values <= sensor.threshold_high)
+    return {
+        "count": len(values),
+        "min": values.min().item(),
+        "max": values.max().item(),
+        "sum": values.sum().item(),
+        "sum_sq": np.dot(values, values).item(),
+        "duration": durations.sum().item(),
+        "in_range": durations[in_range[:-1]].sum().item(),
+        "first_t": seconds[0].item(),
+        "last_t": seconds[-1].item(),
+        "last_in_range": bool(in_range[-1]),
+    }
+
+
+def _merged_stats(session, sensor, start, end, row, months) -> dict:
+    """
+    `history_stats` for a range that reaches into the archive.
+
+    The live aggregates from `row` and per-month aggregates computed in
+    NumPy on the archived columns are merged; the time between the last
+    reading of one part and the first of the next is counted for the
+    earlier part. Percentiles need every value, so the value column of the
+    live range and of each month is gathered into one array.
+    """
+    partials, values = [], []
+    if row.count:
+        partials.append(
+            {
+                "count": row.count,
+                "min": row.min,
+                "max": row.max,
+                "sum": row.avg * row.count,
+                "sum_sq": row.avg_sq * row.count,
+                "duration": row.duration or 0.0,
+                "in_range": row.in_range or 0.0,
+                "first_t": row.first_t - JULIAN_UNIX_EPOCH,
+                "last_t": row.last_t - JULIAN_UNIX_EPOCH,
+                "last_in_range": bool(row.last_in_range),
+            }
+        )
+        source = history_source(session, sensor.id, start, end)
+        live = session.execute(select(source.c.value)).scalars()
+        values.append(np.fromiter(live, dtype=float, count=row.count))
+    for month in months:
+        seconds, month_values = archive.read_arrays(sensor.id, month, start, end)
+        if len(month_values):
+            partials.append(_array_partial(sensor, seconds, month_values))
+            values.append(month_values)
+    if not partials:
+        return dict(EMPTY_STATS)
+    partials.sort(key=lambda p: p["first_t"])
+    n = sum(p["count"] for p in partials)
+    avg = sum(p["sum"] for p in partials) / n
+    duration = sum(p["duration"] for p in partials)
+    in_range = sum(p["in_range"] for p in partials)
+    for part, following in zip(partials, partials[1:]):
+        gap = max(following["first_t"] - part["last_t"], 0.0)
+        duration += gap
+        if part["last_in_range"]:
+            in_range += gap
+    if duration:
+        time_in_range = in_range / duration
+    else:
+        time_in_range = float(sensor.threshold_low <= avg <= sensor.threshold_high)
+    ranks = [math.ceil(0.5 * n) - 1, math.ceil(0.95 * n) - 1]
+    ranked = np.partition(np.concatenate(values), ranks)
+    return {
+        "count": n,
+        "min": min(p["min"] for p in partials),
+        "max": max(p["max"] for p in partials),
+        "avg": avg,
+        "stddev": math.sqrt(max(sum(p["sum_sq"] for p in partials) / n - avg**2, 0.0)),
+        "p50": ranked[ranks[0]].item(),
+        "p95": ranked[ranks[1]].item(),
+        "time_in_range": time_in_range,
+    }
+
+
+def history_stats(session, sensor, start=None, end=None) -> dict:
+    """
+    Summary statistics of a sensor's readings, computed in the database.
+
+    `time_in_range` is the share of time the value stayed within the
+    sensor's thresholds. Ranges that reach into the archive merge the
+    database aggregates with aggregates of the archived months.
+    """
+    row = session.execute(history_stats_query(session, sensor, start, end)).one()
+    months = archive.overlapping(sensor.id, start, end)
+    if months:
+        return _merged_stats(session, sensor, start, end, row, months)
+    if not row.count:
+        return dict(EMPTY_STATS)
+    time_in_range = 0.0
+    if row.duration:
+        time_in_range = row.in_range / row.duration
+    elif sensor.threshold_low <= row.avg <= sensor.threshold_high:
+        time_in_range = 1.0
+    return {
+        "count": row.count,
+        "min": row.min,
+        "max": row.max,
+        "avg": row.avg,
+        "stddev": math.sqrt(max(row.avg_sq - row.avg * row.avg, 0.0)),
+        "p50": row.p50,
+        "p95": row.p95,
+        "time_in_range": time_in_range,
+    }
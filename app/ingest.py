@@ -0,0 +1,132 @@
+from datetime import datetime
+from sqlalchemy import case, delete, func, insert, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import select
+from app.models import Sensor, SensorData, SensorLatest
+from app.alert_engine import alert_engine, check_thresholds
+from app.sensor_cache import sensor_cache
+from app.partitions import partitions
+from app.rollups import naive_utc, update_rollups
+
+
+def build_reading(sensor_id, value, timestamp=None):
+    return {
+        "sensor_id": sensor_id,
+        "timestamp": naive_utc(timestamp) or datetime.utcnow(),
+        "value": value,
+        "raw": str(value),
+    }
+
+
+def reading_status(sensor, value: float) -> str:
+    violation_type, _ = check_thresholds(sensor, value)
+    return "red" if violation_type else "green"
+
+
+def _update_latest(session, readings):
+    latest = {}
+    for reading in readings:
+        current = latest.get(reading["sensor_id"])
+        if current is None or reading["timestamp"] >= current["timestamp"]:
+            latest[reading["sensor_id"]] = reading
+    rows = []
+    for sensor_id, reading in latest.items():
+        sensor = sensor_cache.get(sensor_id)
+        if sensor is None:
+            continue
+        rows.append(
+            {
+                "sensor_id": sensor_id,
+                "timestamp": reading["timestamp"],
+                "value": reading["value"],
+                "status": reading_status(sensor, reading["value"]),
+            }
+        )
+    if not rows:
+        return
+    stmt = sqlite_insert(SensorLatest)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SensorLatest.sensor_id],
+        set_={
+            "timestamp": stmt.excluded.timestamp,
+            "value": stmt.excluded.value,
+            "status": stmt.excluded.status,
+        },
+        where=stmt.excluded.timestamp >= SensorLatest.timestamp,
+    )
+    session.execute(stmt, rows)
+
+
+def write_readings(session, readings):
+    """
+    Insert readings with one bulk statement, evaluate them against the
+    sensor thresholds and refresh `SensorLatest` and the rollups. The caller
+    owns the transaction.
+
+    Args:
+        session: Open session the rows are written in
+        readings: List of dicts as returned by `build_reading`
+
+    Returns:
+        The ids of the inserted rows, in input order.
+    """
+    if not readings:
+        return []
+    if partitions.enabled:
+        data_ids = partitions.insert(session, readings)
+    else:
+        data_ids = list(
+            session.scalars(
+                insert(SensorData).returning(
+                    SensorData.id, sort_by_parameter_order=True
+                ),
+                readings,
+            )
+        )
+    _update_latest(session, readings)
+    update_rollups(session, readings)
+    alert_engine.evaluate(session, readings)
+    return data_ids
+
+
+def rebuild_sensor_latest(session) -> int:
+    """Recompute `SensorLatest` from `SensorData`. Returns the row count."""
+    readings = partitions.readings(session)
+    ranked = select(
+        readings.c.sensor_id,
+        readings.c.timestamp,
+        readings.c.value,
+        func.row_number()
+        .over(
+            partition_by=readings.c.sensor_id,
+            order_by=(readings.c.timestamp.desc(), readings.c.id.desc()),
+        )
+        .label("rn"),
+    ).subquery()
+    status = case(
+        (
+            or_(
+                ranked.c.value < Sensor.threshold_low,
+                ranked.c.value > Sensor.threshold_high,
+            ),
+            "red",
+        ),
+        else_="green",
+    )
+    session.execute(delete(SensorLatest))
+    session.execute(
+        insert(SensorLatest).from_select(
+            ["sensor_id", "timestamp", "value", "status"],
+            select(ranked.c.sensor_id, ranked.c.timestamp, ranked.c.value, status)
+            .join(Sensor, Sensor.id == ranked.c.sensor_id)
+            .where(ranked.c.rn == 1),
+        )
+    )
+    return session.exec(select(func.count()).select_from(SensorLatest)).one()
+
+
+def ensure_sensor_latest(session):
+    """Populate `SensorLatest` for databases created before it existed."""
+    if session.exec(select(SensorLatest.sensor_id).limit(1)).first() is None:
+        rebuild_sensor_latest(session)
+        session.commit()
@@ -0,0 +1,137 @@
+import asyncio
+import contextlib
+import logging
+import os
+from sqlmodel import Session
+from app.ingest import write_readings
+from app.dashboard_feed import dashboard_feed
+from app.utils import engine
+
+DURABILITY_ENQUEUE = "enqueue"
+DURABILITY_COMMIT = "commit"
+
+
+class IngestQueue:
+    """
+    Write-behind queue for sensor readings.
+
+    Requests enqueue readings and a single writer task drains the queue,
+    committing up to `max_batch` readings per transaction or whatever arrived
+    within `flush_ms` of the first one. With `commit` durability `submit`
+    waits for the group commit and returns the row id; with `enqueue`
+    durability it returns as soon as the reading is queued. On shutdown
+    `lifespan` waits up to `drain_timeout` seconds for queued readings to
+    be committed.
+    """
+
+    def __init__(
+        self, enabled, durability, max_batch, flush_ms, max_size, drain_timeout
+    ):
+        if durability not in (DURABILITY_ENQUEUE, DURABILITY_COMMIT):
+            raise ValueError(f"Unknown ingest queue durability: {durability}")
+        self.enabled = enabled
+        self.durability = durability
+        self.max_batch = max_batch
+        self.flush_ms = flush_ms
+        self.max_size = max_size
+        self.drain_timeout = drain_timeout
+        self.committed = 0
+        self.commits = 0
+        self._queue = None
+        self._writer = None
+
+    def _ensure_started(self):
+        if self._writer is None or self._writer.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.max_size)
+            self._writer = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, reading):
+        """Queue a reading built with `build_reading`; see class docstring."""
+        self._ensure_started()
+        future = None
+        if self.durability == DURABILITY_COMMIT:
+            future = asyncio.get_running_loop().create_future()
+        await self._queue.put((reading, future))
+        if future is None:
+            return None
+        return await future
+
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _next_group(self):
+        group = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_ms / 1000
+        while len(group) < self.max_batch:
+            try:
+                group.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                group.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return group
+
+    def _commit(self, readings):
+        with Session(engine) as session:
+            data_ids = write_readings(session, readings)
+            session.commit()
+        return data_ids
+
+    async def _run(self):
+        while True:
+            group = await self._next_group()
+            try:
+                data_ids = await asyncio.to_thread(
+                    self._commit, [reading for reading, _ in group]
+                )
+            except Exception as e:
+                logging.exception(f"Error committing ingest group: {e}")
+                for _, future in group:
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+            else:
+                self.committed += len(group)
+                self.commits += 1
+                dashboard_feed.notify()
+                for (_, future), data_id in zip(group, data_ids):
+                    if future is not None and not future.done():
+                        future.set_result(data_id)
+            finally:
+                for _ in group:
+                    self._queue.task_done()
+
+    async def drain(self):
+        """Wait until every queued reading has been committed."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        """Lifespan task that drains the queue when the app shuts down."""
+        try:
+            yield
+        finally:
+            try:
+                await asyncio.wait_for(self.drain(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                logging.warning(
+                    f"Shut down with {self.pending()} queued readings uncommitted"
+                )
+
+
+ingest_queue = IngestQueue(
+    enabled=os.environ.get("INGEST_QUEUE_ENABLED", "0") == "1",
+    durability=os.environ.get("INGEST_QUEUE_DURABILITY", DURABILITY_COMMIT),
+    max_batch=int(os.environ.get("INGEST_QUEUE_MAX_BATCH", "500")),
+    flush_ms=int(os.environ.get("INGEST_QUEUE_FLUSH_MS", "50")),
+    max_size=int(os.environ.get("INGEST_QUEUE_MAX_SIZE", "10000")),
+    drain_timeout=float(os.environ.get("INGEST_QUEUE_DRAIN_SECONDS", "10")),
+)
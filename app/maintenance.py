@@ -0,0 +1,276 @@
+import argparse
+import asyncio
+import sys
+import tempfile
+import threading
+import time
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, select
+from app.db import create_read_engine, create_writer_engine, sqlite_pragmas
+from app.models import SensorData, User
+from app.utils import (
+    authenticate,
+    authenticate_async,
+    engine,
+    ensure_indexes,
+    get_password_hash,
+)
+from app.ingest import rebuild_sensor_latest
+from app.query_plans import check_query_plans
+from app.rollups import backfill_rollups
+from app.retention import retention_job
+from app.archive import archive_job
+from app.partitions import partitions
+
+
+def rebuild_latest(args):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        count = rebuild_sensor_latest(session)
+        session.commit()
+    print(f"Rebuilt latest readings for {count} sensors.")
+
+
+def backfill(args):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        count = backfill_rollups(session)
+        session.commit()
+    print(f"Backfilled {count} rollup buckets.")
+
+
+def migrate(args):
+    ensure_indexes()
+    print("Schema and indexes are up to date.")
+
+
+def check_plans(args):
+    SQLModel.metadata.create_all(engine)
+    failures = 0
+    for name, (plan, scans) in check_query_plans(engine).items():
+        print(f"{'FAIL' if scans else 'ok  '} {name}")
+        for line in plan:
+            print(f"       {line}")
+        failures += bool(scans)
+    if failures:
+        print(f"{failures} hot queries fall back to a full table scan.")
+        sys.exit(1)
+
+
+def retention(args):
+    SQLModel.metadata.create_all(engine)
+    if args.convert:
+        autocommit = engine.execution_options(isolation_level="AUTOCOMMIT")
+        with autocommit.connect() as connection:
+            connection.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            connection.exec_driver_sql("VACUUM")
+        print("Converted the database to auto_vacuum=INCREMENTAL.")
+    if args.raw_days is not None:
+        retention_job.raw_days = args.raw_days
+    if args.rollup_days is not None:
+        retention_job.rollup_days = args.rollup_days
+    if args.archive_days is not None:
+        retention_job.archive_days = args.archive_days
+    report = retention_job.run()
+    print(
+        f"Deleted {report['raw_deleted']} readings, "
+        f"{report['rollups_deleted']} rollup buckets and "
+        f"{report['archive_files_deleted']} archive files in "
+        f"{report['elapsed_seconds']}s."
+    )
+    print(
+        f"Reclaimed {report['bytes_reclaimed']} bytes; the database is "
+        f"{report['file_bytes']} bytes with {report['free_bytes']} bytes free."
+    )
+    if not report["incremental_vacuum"]:
+        print("Free pages are kept for reuse; run with --convert to release them.")
+
+
+def archive_readings(args):
+    SQLModel.metadata.create_all(engine)
+    if args.after_days is not None:
+        archive_job.after_days = args.after_days
+    if not archive_job.after_days:
+        print("Set ARCHIVE_AFTER_DAYS or pass --after-days to archive readings.")
+        sys.exit(1)
+    report = archive_job.run()
+    print(
+        f"Archived {report['archived']} readings from {report['months']} "
+        f"sensor-months before {report['before']:%Y-%m-%d} to "
+        f"{archive_job.archive.root} in {report['elapsed_seconds']}s."
+    )
+
+
+def partition(args):
+    SQLModel.metadata.create_all(engine)
+    if not partitions.enabled:
+        print("Set SENSORDATA_PARTITIONED=1 before moving readings to partitions.")
+        sys.exit(1)
+    with Session(engine) as session:
+        moved = partitions.migrate(session)
+        session.commit()
+        months = partitions.months(session)
+    print(f"Moved {moved} readings; {len(months)} monthly partitions exist.")
+
+
+def _bench_config(label, pragmas, rows, reads):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        writer = create_writer_engine(url, pragmas)
+        reader = create_read_engine(url, pragmas)
+        SQLModel.metadata.create_all(writer)
+        started = time.perf_counter()
+        for i in range(rows):
+            with Session(writer) as session:
+                session.add(SensorData(sensor_id=1, value=i, raw=str(i)))
+                session.commit()
+        commit_rate = rows / (time.perf_counter() - started)
+
+        stop = threading.Event()
+
+        def keep_writing():
+            while not stop.is_set():
+                with Session(writer) as session:
+                    session.add(SensorData(sensor_id=1, value=0.0, raw="0.0"))
+                    session.commit()
+
+        background = threading.Thread(target=keep_writing)
+        background.start()
+        errors = 0
+        started = time.perf_counter()
+        for _ in range(reads):
+            try:
+                with Session(reader) as session:
+                    session.exec(
+                        select(SensorData)
+                        .where(SensorData.sensor_id == 1)
+                        .order_by(SensorData.timestamp.desc())
+                        .limit(1)
+                    ).first()
+            except OperationalError:
+                errors += 1
+        read_rate = reads / (time.perf_counter() - started)
+        stop.set()
+        background.join()
+        writer.dispose()
+        reader.dispose()
+    print(
+        f"{label:>8}: {commit_rate:8.0f} commits/s, "
+        f"{read_rate:8.0f} reads/s during writes, {errors} read errors"
+    )
+
+
+def bench_db(args):
+    _bench_config("defaults", {}, args.rows, args.reads)
+    _bench_config("tuned", sqlite_pragmas(), args.rows, args.reads)
+
+
+async def _login_round(label, logins, login):
+    """Run `logins` concurrent logins while timing a 10 ms ticker."""
+    stalls = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            stalls.append(time.perf_counter() - started - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    users = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick
+    assert all(users)
+    print(
+        f"{label:>8}: {logins / elapsed:6.1f} logins/s, "
+        f"longest event-loop stall {max(stalls) * 1000:6.0f} ms"
+    )
+
+
+def bench_login(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        scratch = create_writer_engine(f"sqlite:///{tmp}/login.db")
+        SQLModel.metadata.create_all(scratch)
+        with Session(scratch) as session:
+            session.add(
+                User(username="u", password_hash=get_password_hash("p"), role="farmer")
+            )
+            session.commit()
+
+        async def inline():
+            return authenticate("u", "p", scratch)
+
+        async def pooled():
+            return await authenticate_async("u", "p", scratch)
+
+        asyncio.run(_login_round("inline", args.logins, inline))
+        asyncio.run(_login_round("pool", args.logins, pooled))
+        scratch.dispose()
+
+
+def main(argv=None):
+    """Database maintenance commands, run with `python -m app.maintenance`."""
+    parser = argparse.ArgumentParser(prog="python -m app.maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "rebuild-latest", help="Recompute the SensorLatest table from SensorData"
+    ).set_defaults(func=rebuild_latest)
+    commands.add_parser(
+        "backfill-rollups", help="Recompute the rollup tables from SensorData"
+    ).set_defaults(func=backfill)
+    commands.add_parser(
+        "migrate", help="Create missing tables and indexes on an existing database"
+    ).set_defaults(func=migrate)
+    commands.add_parser(
+        "check-plans",
+        help="Explain the hot queries and exit non-zero on full table scans",
+    ).set_defaults(func=check_plans)
+    prune = commands.add_parser(
+        "retention",
+        help="Delete expired readings and rollups, then compact the database",
+    )
+    prune.add_argument("--raw-days", type=int, help="Override RETENTION_RAW_DAYS")
+    prune.add_argument(
+        "--rollup-days", type=int, help="Override RETENTION_ROLLUP_DAYS"
+    )
+    prune.add_argument(
+        "--archive-days", type=int, help="Override RETENTION_ARCHIVE_DAYS"
+    )
+    prune.add_argument(
+        "--convert",
+        action="store_true",
+        help="Switch the database to incremental auto-vacuum first (full VACUUM)",
+    )
+    prune.set_defaults(func=retention)
+    move = commands.add_parser(
+        "archive",
+        help="Move readings of complete old months to the Parquet archive",
+    )
+    move.add_argument("--after-days", type=int, help="Override ARCHIVE_AFTER_DAYS")
+    move.set_defaults(func=archive_readings)
+    commands.add_parser(
+        "partition",
+        help="Move readings from sensordata into monthly partitions",
+    ).set_defaults(func=partition)
+    bench = commands.add_parser(
+        "bench-db",
+        help="Compare default and tuned SQLite settings on a scratch database",
+    )
+    bench.add_argument("--rows", type=int, default=5000)
+    bench.add_argument("--reads", type=int, default=2000)
+    bench.set_defaults(func=bench_db)
+    login = commands.add_parser(
+        "bench-login",
+        help="Time concurrent logins and how long they stall the event loop",
+    )
+    login.add_argument("--logins", type=int, default=32)
+    login.set_defaults(func=bench_login)
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
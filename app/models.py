@@ -1,6 +1,7 @@
 import reflex as rx
 from datetime import datetime
 import sqlmodel
+from sqlalchemy import Index, text
 from sqlmodel import SQLModel, Field
 
 
@@ -24,7 +25,7 @@ class Parcel(SQLModel, table=True):
 class Sensor(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     id_code: str
-    parcel_id: int = Field(foreign_key="parcel.id")
+    parcel_id: int = Field(foreign_key="parcel.id", index=True)
     type: str
     unit: str
     description: str
@@ -34,6 +35,10 @@ class Sensor(SQLModel, table=True):
 
 
 class SensorData(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_sensordata_sensor_id_timestamp", "sensor_id", "timestamp"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     sensor_id: int = Field(foreign_key="sensor.id")
     timestamp: datetime = Field(default_factory=datetime.utcnow)
@@ -42,10 +47,48 @@ class SensorData(SQLModel, table=True):
 
 
 class Alert(SQLModel, table=True):
+    __table_args__ = (
+        Index(
+            "ix_alert_unacknowledged_sensor_type",
+            "sensor_id",
+            "type",
+            sqlite_where=text("acknowledged = 0"),
+        ),
+        Index(
+            "ix_alert_unacknowledged_timestamp",
+            "timestamp",
+            sqlite_where=text("acknowledged = 0"),
+        ),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
-    sensor_id: int = Field(foreign_key="sensor.id")
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    sensor_id: int = Field(foreign_key="sensor.id", index=True)
+    timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
     type: str
     message: str
     acknowledged: bool = False
-    created_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class SensorLatest(SQLModel, table=True):
+    sensor_id: int = Field(foreign_key="sensor.id", primary_key=True)
+    timestamp: datetime
+    value: float
+    status: str
+
+
+class SensorRollup(SQLModel, table=True):
+    sensor_id: int = Field(foreign_key="sensor.id", primary_key=True)
+    resolution: int = Field(primary_key=True)
+    bucket: int = Field(primary_key=True)
+    count: int
+    min: float
+    max: float
+    sum: float
+    last: float
+    last_timestamp: datetime
+
+
+class SensorDataSequence(SQLModel, table=True):
+    id: int = Field(default=1, primary_key=True)
+    value: int
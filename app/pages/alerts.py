@@ -54,6 +54,60 @@ def alert_row(alert: dict) -> rx.Component:
     )
 
 
+def confirm_acknowledge_all() -> rx.Component:
+    return rx.cond(
+        AlertState.confirm_ack_open,
+        rx.el.div(
+            rx.el.div(
+                rx.el.h3(
+                    "Acknowledge all open alerts?",
+                    class_name="text-lg font-bold text-slate-800 mb-2",
+                ),
+                rx.el.p(
+                    f"This acknowledges {AlertState.confirm_ack_count} open alerts"
+                    ", including those on other pages.",
+                    class_name="text-sm text-slate-500 mb-6",
+                ),
+                rx.el.div(
+                    rx.el.button(
+                        "Cancel",
+                        on_click=AlertState.cancel_acknowledge_matching,
+                        class_name="text-sm font-medium text-slate-600 hover:text-blue-600 px-3 py-2",
+                    ),
+                    rx.el.button(
+                        f"Acknowledge {AlertState.confirm_ack_count}",
+                        on_click=AlertState.acknowledge_matching,
+                        class_name=f"{M3Styles.BUTTON_PRIMARY} py-1.5 px-4 text-xs shadow-none hover:shadow-md",
+                    ),
+                    class_name="flex items-center justify-end gap-2",
+                ),
+                class_name=f"{M3Styles.CARD} max-w-md w-full",
+            ),
+            class_name="fixed inset-0 z-50 flex items-center justify-center bg-slate-900/40 p-4",
+        ),
+    )
+
+
+def pager() -> rx.Component:
+    return rx.el.div(
+        rx.el.button(
+            rx.icon("chevron-left", class_name="w-4 h-4"),
+            "Newer",
+            on_click=AlertState.newer_page,
+            disabled=~AlertState.has_newer,
+            class_name="flex items-center gap-1 text-sm font-medium text-slate-600 hover:text-blue-600 disabled:opacity-40 px-3 py-2",
+        ),
+        rx.el.button(
+            "Older",
+            rx.icon("chevron-right", class_name="w-4 h-4"),
+            on_click=AlertState.older_page,
+            disabled=~AlertState.has_older,
+            class_name="flex items-center gap-1 text-sm font-medium text-slate-600 hover:text-blue-600 disabled:opacity-40 px-3 py-2",
+        ),
+        class_name="flex items-center justify-between mt-6",
+    )
+
+
 def alerts_page() -> rx.Component:
     return rx.el.div(
         navbar(),
@@ -94,13 +148,29 @@ def alerts_page() -> rx.Component:
                             ),
                             class_name="flex items-center ml-4",
                         ),
+                        rx.el.div(
+                            rx.el.button(
+                                "Acknowledge page",
+                                on_click=AlertState.acknowledge_page,
+                                class_name="text-sm font-medium text-slate-600 hover:text-blue-600 px-3 py-2",
+                            ),
+                            rx.el.button(
+                                "Acknowledge all",
+                                on_click=AlertState.confirm_acknowledge_matching,
+                                class_name=f"{M3Styles.BUTTON_PRIMARY} py-1.5 px-4 text-xs shadow-none hover:shadow-md",
+                            ),
+                            class_name="flex items-center gap-2 ml-auto",
+                        ),
                         class_name="flex items-center mb-6",
                     ),
                     rx.cond(
                         AlertState.alerts.length() > 0,
                         rx.el.div(
-                            rx.foreach(AlertState.alerts, alert_row),
-                            class_name="flex flex-col gap-4",
+                            rx.el.div(
+                                rx.foreach(AlertState.alerts, alert_row),
+                                class_name="flex flex-col gap-4",
+                            ),
+                            pager(),
                         ),
                         rx.el.div(
                             rx.icon(
@@ -123,5 +193,6 @@ def alerts_page() -> rx.Component:
             ),
             class_name="bg-slate-50 min-h-[calc(100vh-64px)]",
         ),
+        confirm_acknowledge_all(),
         class_name=f"min-h-screen w-full {M3Styles.FONT_FAMILY}",
     )
\ No newline at end of file
@@ -74,9 +74,15 @@ def sensor_detail_page() -> rx.Component:
                             ),
                             rx.el.div(
                                 rx.el.div(
-                                    rx.el.h3(
-                                        "Historical Analysis",
-                                        class_name="text-lg font-bold text-slate-800",
+                                    rx.el.div(
+                                        rx.el.h3(
+                                            "Historical Analysis",
+                                            class_name="text-lg font-bold text-slate-800",
+                                        ),
+                                        rx.el.p(
+                                            SensorHistoryState.point_count_str,
+                                            class_name="text-xs text-slate-400",
+                                        ),
                                     ),
                                     rx.el.div(
                                         range_button("24h", "24h"),
@@ -118,7 +124,32 @@ def sensor_detail_page() -> rx.Component:
                                     SensorHistoryState.stat_max_str,
                                     SensorHistoryState.sensor_unit,
                                 ),
-                                class_name="grid grid-cols-1 md:grid-cols-3 gap-6",
+                                stat_box(
+                                    "Std Deviation",
+                                    SensorHistoryState.stat_stddev_str,
+                                    SensorHistoryState.sensor_unit,
+                                ),
+                                stat_box(
+                                    "Median",
+                                    SensorHistoryState.stat_p50_str,
+                                    SensorHistoryState.sensor_unit,
+                                ),
+                                stat_box(
+                                    "95th Percentile",
+                                    SensorHistoryState.stat_p95_str,
+                                    SensorHistoryState.sensor_unit,
+                                ),
+                                stat_box(
+                                    "Time in Range",
+                                    SensorHistoryState.stat_in_range_str,
+                                    "%",
+                                ),
+                                stat_box(
+                                    "Readings",
+                                    SensorHistoryState.raw_point_count_str,
+                                    "",
+                                ),
+                                class_name="grid grid-cols-1 md:grid-cols-4 gap-6",
                             ),
                         ),
                         rx.el.div(
@@ -0,0 +1,287 @@
+import os
+import re
+import threading
+from datetime import datetime
+from sqlalchemy import (
+    Column,
+    Index,
+    MetaData,
+    Table,
+    func,
+    insert,
+    union_all,
+    update,
+)
+from sqlmodel import Session, select
+from app.utils import engine, read_engine
+from app.models import SensorData, SensorDataSequence
+
+PARTITION_NAME = re.compile(r"^sensordata_(\d{4})(\d{2})$")
+READING_COLUMNS = ("id", "sensor_id", "timestamp", "value", "raw")
+
+
+def month_start(timestamp: datetime) -> datetime:
+    return datetime(timestamp.year, timestamp.month, 1)
+
+
+def next_month(start: datetime) -> datetime:
+    if start.month == 12:
+        return datetime(start.year + 1, 1, 1)
+    return datetime(start.year, start.month + 1, 1)
+
+
+class Partitions:
+    """
+    Routing layer between the app and the tables that hold raw readings.
+
+    With partitioning disabled every reading lives in `sensordata`. When
+    enabled (SENSORDATA_PARTITIONED=1) new readings are written to monthly
+    tables `sensordata_YYYYMM`, each with its own `(sensor_id, timestamp)`
+    index, and ids come from `SensorDataSequence` so they stay unique across
+    tables. The `sensordata` table itself is always read as well, so rows
+    written before partitioning was switched on stay visible until
+    `python -m app.maintenance partition` moves them.
+
+    `readings` returns the rows of a sensor and time range as a subquery
+    that only unions the partitions overlapping the range, so expired
+    months can be dropped with `drop` instead of deleted row by row.
+    Partitioning is one-way: turning it off again hides the monthly tables.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._metadata = MetaData()
+        self._tables: dict[datetime, Table] = {}
+        self._months: list[datetime] = []
+        self._schema_version = None
+
+    def name(self, month: datetime) -> str:
+        return f"sensordata_{month:%Y%m}"
+
+    def table(self, month: datetime) -> Table:
+        with self._lock:
+            table = self._tables.get(month)
+            if table is None:
+                name = self.name(month)
+                columns = [
+                    Column(
+                        c.name, c.type, primary_key=c.primary_key, nullable=c.nullable
+                    )
+                    for c in SensorData.__table__.columns
+                ]
+                table = Table(name, self._metadata, *columns)
+                Index(
+                    f"ix_{name}_sensor_id_timestamp",
+                    table.c.sensor_id,
+                    table.c.timestamp,
+                )
+                self._tables[month] = table
+            return table
+
+    def months(self, session) -> list[datetime]:
+        """Existing partitions, oldest first; re-read when the schema changes."""
+        connection = session.connection()
+        version = connection.exec_driver_sql("PRAGMA schema_version").scalar()
+        if version != self._schema_version:
+            names = connection.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).scalars()
+            months = []
+            for name in names:
+                match = PARTITION_NAME.match(name)
+                if match:
+                    year, month = int(match.group(1)), int(match.group(2))
+                    months.append(datetime(year, month, 1))
+            self._months = sorted(months)
+            self._schema_version = version
+        return self._months
+
+    def tables(self, session, start=None, end=None, before=None) -> list[Table]:
+        """`sensordata` plus the partitions that can hold readings in range."""
+        tables = [SensorData.__table__]
+        if not self.enabled:
+            return tables
+        for month in self.months(session):
+            if end is not None and month > end:
+                continue
+            if before is not None and month >= before:
+                continue
+            if start is not None and next_month(month) <= start:
+                continue
+            tables.append(self.table(month))
+        return tables
+
+    def readings(self, session, sensor_id=None, start=None, end=None, before=None):
+        """
+        Raw readings as a subquery with the columns of `SensorData`.
+
+        Args:
+            session: Session whose connection the partitions are listed with
+            sensor_id: Only readings of this sensor
+            start: Only readings at or after this time
+            end: Only readings at or before this time
+            before: Only readings strictly before this time
+        """
+        selects = []
+        for table in self.tables(session, start, end, before):
+            query = select(*(table.c[c] for c in READING_COLUMNS))
+            if sensor_id is not None:
+                query = query.where(table.c.sensor_id == sensor_id)
+            if start is not None:
+                query = query.where(table.c.timestamp >= start)
+            if end is not None:
+                query = query.where(table.c.timestamp <= end)
+            if before is not None:
+                query = query.where(table.c.timestamp < before)
+            selects.append(query)
+        if len(selects) == 1:
+            return selects[0].subquery("readings")
+        return union_all(*selects).subquery("readings")
+
+    def ensure(self, session, month: datetime) -> Table:
+        table = self.table(month)
+        table.create(session.connection(), checkfirst=True)
+        return table
+
+    def drop_before(self, cutoff: datetime) -> int:
+        """Drop partitions of months ending before `cutoff`; returns their rows."""
+        if not self.enabled:
+            return 0
+        dropped = 0
+        with Session(engine) as session:
+            for month in self.months(session):
+                if next_month(month) > cutoff:
+                    continue
+                table = self.table(month)
+                dropped += session.execute(
+                    select(func.count()).select_from(table)
+                ).scalar()
+                table.drop(session.connection())
+            session.commit()
+        return dropped
+
+    def delete_readings(
+        self, sensor_id: int, chunk_size: int, start=None, before=None, max_id=None
+    ) -> int:
+        """
+        Delete a sensor's readings in `[start, before)` from every table,
+        `chunk_size` rows per transaction. With `max_id`, rows added after
+        that id are kept.
+        """
+        with Session(read_engine) as session:
+            tables = self.tables(session, start=start, before=before)
+        deleted = 0
+        for table in tables:
+            expired = select(table.c.id).where(table.c.sensor_id == sensor_id)
+            if start is not None:
+                expired = expired.where(table.c.timestamp >= start)
+            if before is not None:
+                expired = expired.where(table.c.timestamp < before)
+            if max_id is not None:
+                expired = expired.where(table.c.id <= max_id)
+            statement = table.delete().where(
+                table.c.id.in_(expired.limit(chunk_size))
+            )
+            while True:
+                with Session(engine) as session:
+                    count = session.execute(statement).rowcount
+                    session.commit()
+                deleted += count
+                if count < chunk_size:
+                    break
+        return deleted
+
+    def drop_if_archived(self, month: datetime, archived: dict[int, int]) -> bool:
+        """
+        Drop a month's partition if every row in it is archived, i.e. each
+        sensor's rows are covered by its entry in `archived`, a map of
+        sensor id to the highest archived id. The check runs in the
+        transaction that drops the table.
+        """
+        if not self.enabled or not archived:
+            return False
+        table = self.table(month)
+        with Session(engine) as session:
+            if month not in self.months(session):
+                return False
+            other = select(table.c.id).where(table.c.sensor_id.notin_(list(archived)))
+            if session.execute(other.limit(1)).first() is not None:
+                return False
+            for sensor_id, max_id in archived.items():
+                newer = (
+                    select(table.c.id)
+                    .where(table.c.sensor_id == sensor_id)
+                    .where(table.c.id > max_id)
+                    .limit(1)
+                )
+                if session.execute(newer).first() is not None:
+                    return False
+            table.drop(session.connection())
+            session.commit()
+        return True
+
+    def allocate_ids(self, session, count: int) -> range:
+        """Reserve `count` consecutive ids in the caller's transaction."""
+        last = session.execute(
+            update(SensorDataSequence)
+            .where(SensorDataSequence.id == 1)
+            .values(value=SensorDataSequence.value + count)
+            .returning(SensorDataSequence.value)
+        ).scalar()
+        if last is None:
+            source = self.readings(session)
+            current = session.execute(select(func.max(source.c.id))).scalar() or 0
+            last = current + count
+            session.add(SensorDataSequence(id=1, value=last))
+            session.flush()
+        return range(last - count + 1, last + 1)
+
+    def insert(self, session, readings: list[dict]) -> list[int]:
+        """Insert readings into their monthly partitions; returns their ids."""
+        ids = self.allocate_ids(session, len(readings))
+        by_month = {}
+        for data_id, reading in zip(ids, readings):
+            month = month_start(reading["timestamp"])
+            by_month.setdefault(month, []).append({"id": data_id, **reading})
+        for month, rows in by_month.items():
+            session.execute(insert(self.ensure(session, month)), rows)
+        return list(ids)
+
+    def migrate(self, session) -> int:
+        """
+        Move rows from `sensordata` into monthly partitions, committing
+        once per month. Returns the number of rows moved.
+        """
+        base = SensorData.__table__
+        sensor_ids = session.execute(select(base.c.sensor_id).distinct()).scalars()
+        sensor_ids = list(sensor_ids)
+        if not sensor_ids:
+            return 0
+        first, last = session.execute(
+            select(func.min(base.c.timestamp), func.max(base.c.timestamp))
+        ).one()
+        self.allocate_ids(session, 0)
+        moved = 0
+        month = month_start(first)
+        while month <= last:
+            in_month = (
+                base.c.sensor_id.in_(sensor_ids)
+                & (base.c.timestamp >= month)
+                & (base.c.timestamp < next_month(month))
+            )
+            rows = select(*(base.c[c] for c in READING_COLUMNS)).where(in_month)
+            if session.execute(rows.limit(1)).first() is not None:
+                table = self.ensure(session, month)
+                moved += session.execute(
+                    insert(table).from_select(list(READING_COLUMNS), rows)
+                ).rowcount
+                session.execute(base.delete().where(in_month))
+                session.commit()
+            month = next_month(month)
+        return moved
+
+
+partitions = Partitions(
+    enabled=os.environ.get("SENSORDATA_PARTITIONED", "0") == "1"
+)
@@ -0,0 +1,86 @@
+import re
+from datetime import datetime, timedelta
+from sqlmodel import Session, SQLModel
+from app.models import Sensor
+from app.alert_counters import open_alerts_query
+from app.alert_engine import open_alerts_by_time_query
+from app.alerts import alerts_query
+from app.dashboard_feed import counts_query, sensor_status_query, top_alerts_query
+from app.history import history_page_query, history_points_query, history_stats_query
+from app.partitions import PARTITION_NAME
+from app.rollups import rollup_query
+from app.sensor_cache import parcel_sensors_query
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+# Queries that read every row of a small table by design: the dashboard
+# snapshot lists all sensors and counts all parcels.
+WHOLE_TABLE_READS = {
+    "dashboard_feed.counts": {"parcel"},
+    "dashboard_feed.sensor_statuses": {"sensor"},
+}
+
+
+def hot_queries(session) -> dict:
+    """
+    The request-path statements of the app, built with the same query
+    builders the routes, states and background jobs use.
+    """
+    now = datetime.utcnow()
+    day = now - timedelta(days=1)
+    sensor = Sensor(id=1, threshold_low=0, threshold_high=100)
+    return {
+        "routes.get_parcel_sensors": parcel_sensors_query(1),
+        "routes.get_sensor_history": history_page_query(
+            session, 1, day, now, 101, (now, 1)
+        ),
+        "sensor_history_state.load_history": history_points_query(
+            session, 1, day, now
+        ),
+        "sensor_history_state.load_history[rollup]": rollup_query(
+            1, 3600, now - timedelta(days=30), now
+        ),
+        "sensor_history_state.load_history[stats]": history_stats_query(
+            session, sensor, now - timedelta(days=7), now
+        ),
+        "alert_state.load_alerts": alerts_query("HIGH", before=(now, 1)),
+        "alert_state.load_alerts[history]": alerts_query(
+            show_history=True, after=(now, 1)
+        ),
+        "alert_counters.reconcile": open_alerts_query(),
+        "alert_engine.load": open_alerts_by_time_query(),
+        "dashboard_feed.counts": counts_query(),
+        "dashboard_feed.sensor_statuses": sensor_status_query(),
+        "dashboard_feed.active_alerts_list": top_alerts_query(),
+    }
+
+
+def explain(connection, statement) -> list[str]:
+    """Return the `EXPLAIN QUERY PLAN` detail lines for a statement."""
+    compiled = statement.compile(dialect=connection.dialect)
+    params = tuple(None for _ in compiled.positiontup or ())
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+    return [row[-1] for row in rows]
+
+
+def check_query_plans(engine) -> dict:
+    """
+    Explain every hot query and collect those that scan a whole table
+    without an index, other than the reads listed in `WHOLE_TABLE_READS`.
+
+    Returns:
+        A mapping of query name to `(plan_lines, full_scan_tables)`.
+    """
+    tables = set(SQLModel.metadata.tables)
+    report = {}
+    with Session(engine) as session:
+        for name, statement in hot_queries(session).items():
+            plan = explain(session.connection(), statement)
+            scans = [
+                m.group(1)
+                for m in map(FULL_SCAN.match, plan)
+                if m and (m.group(1) in tables or PARTITION_NAME.match(m.group(1)))
+                and m.group(1) not in WHOLE_TABLE_READS.get(name, ())
+            ]
+            report[name] = (plan, scans)
+    return report
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from sqlmodel import Session, select
+from app.archive import archive, archive_job
+from app.models import SensorRollup
+from app.partitions import partitions
+from app.rollups import RESOLUTIONS, to_epoch
+from app.utils import engine, read_engine
+
+PRUNED_RESOLUTIONS = (RESOLUTIONS["1m"], RESOLUTIONS["1h"])
+
+
+def _pragma(connection, name: str) -> int:
+    return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def database_size(connection) -> dict:
+    page_size = _pragma(connection, "page_size")
+    return {
+        "file_bytes": _pragma(connection, "page_count") * page_size,
+        "free_bytes": _pragma(connection, "freelist_count") * page_size,
+    }
+
+
+class RetentionJob:
+    """
+    Deletes raw readings older than `raw_days` and minute and hour rollups
+    older than `rollup_days` (daily rollups are kept), then compacts the
+    database. A value of 0 keeps that data forever.
+
+    With archiving enabled (see app/archive.py) raw readings leave the live
+    tables through the archive job instead: `raw_days` is not applied, so
+    rows the job has not moved yet are never lost, and archived months
+    older than `archive_days` are deleted from the archive. Live rows are
+    only deleted once they would have expired from the archive as well.
+
+    Monthly partitions that expired entirely are dropped. Other rows are
+    deleted per sensor in transactions of at most `chunk_size` rows, each a
+    range on the `(sensor_id, timestamp)` index or the rollup primary key,
+    so the writer lock is only ever held briefly. Freed pages
+    are returned to the filesystem with `PRAGMA incremental_vacuum` when the
+    database uses `auto_vacuum=INCREMENTAL` (the default for new databases,
+    see app/db.py); older databases keep them for reuse until converted
+    with `python -m app.maintenance retention --convert`.
+    """
+
+    def __init__(
+        self,
+        raw_days,
+        rollup_days,
+        archive_days,
+        interval_hours,
+        chunk_size,
+        vacuum_pages,
+    ):
+        self.raw_days = raw_days
+        self.rollup_days = rollup_days
+        self.archive_days = archive_days
+        self.interval_hours = interval_hours
+        self.chunk_size = chunk_size
+        self.vacuum_pages = vacuum_pages
+        self.last_report: dict | None = None
+        self._task = None
+
+    def enabled(self) -> bool:
+        return bool(self.raw_days or self.rollup_days or self.archive_days)
+
+    def rollups_kept_since(self, resolution: int) -> datetime | None:
+        """Oldest time rollups of `resolution` are kept for; None if forever."""
+        if not self.rollup_days or resolution not in PRUNED_RESOLUTIONS:
+            return None
+        return datetime.utcnow() - timedelta(days=self.rollup_days)
+
+    def _delete_chunks(self, statement) -> int:
+        """Run a chunk-limited delete in its own transaction until it runs dry."""
+        deleted = 0
+        while True:
+            with Session(engine) as session:
+                count = session.execute(statement).rowcount
+                session.commit()
+            deleted += count
+            if count < self.chunk_size:
+                return deleted
+
+    def _sensor_ids(self, model) -> list[int]:
+        with Session(read_engine) as session:
+            return list(session.exec(select(model.sensor_id).distinct()).all())
+
+    def prune_raw(self, cutoff: datetime) -> int:
+        """Drop whole expired partitions, then delete what is left row-wise."""
+        deleted = partitions.drop_before(cutoff)
+        with Session(read_engine) as session:
+            readings = partitions.readings(session, before=cutoff)
+            sensor_ids = session.exec(select(readings.c.sensor_id).distinct()).all()
+        for sensor_id in sensor_ids:
+            deleted += partitions.delete_readings(
+                sensor_id, self.chunk_size, before=cutoff
+            )
+        return deleted
+
+    def prune_rollups(self, cutoff: datetime) -> int:
+        deleted = 0
+        for sensor_id in self._sensor_ids(SensorRollup):
+            for resolution in PRUNED_RESOLUTIONS:
+                expired = (
+                    select(SensorRollup.bucket)
+                    .where(SensorRollup.sensor_id == sensor_id)
+                    .where(SensorRollup.resolution == resolution)
+                    .where(SensorRollup.bucket < to_epoch(cutoff))
+                    .limit(self.chunk_size)
+                )
+                deleted += self._delete_chunks(
+                    delete(SensorRollup)
+                    .where(SensorRollup.sensor_id == sensor_id)
+                    .where(SensorRollup.resolution == resolution)
+                    .where(SensorRollup.bucket.in_(expired))
+                )
+        return deleted
+
+    def compact(self) -> dict:
+        """Release free pages in bounded steps and refresh planner statistics."""
+        with engine.connect() as connection:
+            incremental = _pragma(connection, "auto_vacuum") == 2
+            free = _pragma(connection, "freelist_count") if incremental else 0
+            while free:
+                connection.exec_driver_sql(
+                    f"PRAGMA incremental_vacuum({self.vacuum_pages})"
+                )
+                connection.commit()
+                remaining = _pragma(connection, "freelist_count")
+                free = remaining if remaining < free else 0
+            connection.exec_driver_sql("PRAGMA optimize")
+            connection.commit()
+            return {"incremental_vacuum": incremental, **database_size(connection)}
+
+    def run(self, now: datetime | None = None) -> dict:
+        """Apply the policy once and return a report of what was removed."""
+        now = now or datetime.utcnow()
+        started = time.perf_counter()
+        with engine.connect() as connection:
+            before = database_size(connection)["file_bytes"]
+        raw_deleted = rollups_deleted = archive_files = archive_bytes = 0
+        if archive_job.enabled():
+            if self.archive_days:
+                cutoff = now - timedelta(days=self.archive_days)
+                archive_files, archive_bytes = archive.prune(cutoff)
+                raw_deleted = self.prune_raw(cutoff)
+        elif self.raw_days:
+            raw_deleted = self.prune_raw(now - timedelta(days=self.raw_days))
+        if self.rollup_days:
+            rollups_deleted = self.prune_rollups(
+                now - timedelta(days=self.rollup_days)
+            )
+        compaction = self.compact()
+        report = {
+            "raw_deleted": raw_deleted,
+            "rollups_deleted": rollups_deleted,
+            "archive_files_deleted": archive_files,
+            "archive_bytes_deleted": archive_bytes,
+            "bytes_reclaimed": before - compaction["file_bytes"],
+            "file_bytes": compaction["file_bytes"],
+            "free_bytes": compaction["free_bytes"],
+            "incremental_vacuum": compaction["incremental_vacuum"],
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+        }
+        self.last_report = report
+        return report
+
+    def start(self):
+        """Start the periodic retention task if a policy is configured."""
+        if not self.enabled() or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                report = await asyncio.to_thread(self.run)
+                logging.info(f"Retention: {report}")
+            except Exception as e:
+                logging.exception(f"Error applying retention policy: {e}")
+            await asyncio.sleep(self.interval_hours * 3600)
+
+
+retention_job = RetentionJob(
+    raw_days=int(os.environ.get("RETENTION_RAW_DAYS", "0")),
+    rollup_days=int(os.environ.get("RETENTION_ROLLUP_DAYS", "0")),
+    archive_days=int(os.environ.get("RETENTION_ARCHIVE_DAYS", "0")),
+    interval_hours=float(os.environ.get("RETENTION_INTERVAL_HOURS", "24")),
+    chunk_size=int(os.environ.get("RETENTION_CHUNK_SIZE", "5000")),
+    vacuum_pages=int(os.environ.get("RETENTION_VACUUM_PAGES", "1000")),
+)
@@ -0,0 +1,188 @@
+import calendar
+from datetime import datetime, timezone
+from sqlalchemy import Integer, case, cast, delete, func, insert, literal
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import select
+from app.models import SensorRollup
+from app.partitions import partitions
+
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+MIN_CHART_POINTS = 300
+RAW_CHART_LIMIT = 20_000
+
+
+def to_epoch(timestamp: datetime) -> int:
+    return calendar.timegm(timestamp.utctimetuple())
+
+
+def from_epoch(seconds: int) -> datetime:
+    return datetime.utcfromtimestamp(seconds)
+
+
+def naive_utc(timestamp: datetime | None) -> datetime | None:
+    """Timestamps are stored as naive UTC; convert aware ones to that."""
+    if timestamp is None or timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def update_rollups(session, readings):
+    """Fold a batch of readings into every rollup resolution (upsert)."""
+    buckets = {}
+    for reading in readings:
+        epoch = to_epoch(reading["timestamp"])
+        for resolution in RESOLUTIONS.values():
+            key = (reading["sensor_id"], resolution, epoch - epoch % resolution)
+            value = reading["value"]
+            row = buckets.get(key)
+            if row is None:
+                buckets[key] = {
+                    "sensor_id": key[0],
+                    "resolution": key[1],
+                    "bucket": key[2],
+                    "count": 1,
+                    "min": value,
+                    "max": value,
+                    "sum": value,
+                    "last": value,
+                    "last_timestamp": reading["timestamp"],
+                }
+                continue
+            row["count"] += 1
+            row["min"] = min(row["min"], value)
+            row["max"] = max(row["max"], value)
+            row["sum"] += value
+            if reading["timestamp"] >= row["last_timestamp"]:
+                row["last"] = value
+                row["last_timestamp"] = reading["timestamp"]
+    if not buckets:
+        return
+    stmt = sqlite_insert(SensorRollup)
+    newer = stmt.excluded.last_timestamp >= SensorRollup.last_timestamp
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            SensorRollup.sensor_id,
+            SensorRollup.resolution,
+            SensorRollup.bucket,
+        ],
+        set_={
+            "count": SensorRollup.count + stmt.excluded.count,
+            "min": func.min(SensorRollup.min, stmt.excluded.min),
+            "max": func.max(SensorRollup.max, stmt.excluded.max),
+            "sum": SensorRollup.sum + stmt.excluded.sum,
+            "last": case((newer, stmt.excluded.last), else_=SensorRollup.last),
+            "last_timestamp": case(
+                (newer, stmt.excluded.last_timestamp),
+                else_=SensorRollup.last_timestamp,
+            ),
+        },
+    )
+    session.execute(stmt, list(buckets.values()))
+
+
+def backfill_rollups(session) -> int:
+    """Recompute every rollup from `SensorData`. Returns the bucket count."""
+    session.execute(delete(SensorRollup))
+    readings = partitions.readings(session)
+    epoch = cast(func.strftime("%s", readings.c.timestamp), Integer)
+    for resolution in RESOLUTIONS.values():
+        bucket = (epoch // resolution) * resolution
+        ranked = select(
+            readings.c.sensor_id,
+            readings.c.timestamp,
+            readings.c.value,
+            bucket.label("bucket"),
+            func.row_number()
+            .over(
+                partition_by=(readings.c.sensor_id, bucket),
+                order_by=(readings.c.timestamp.desc(), readings.c.id.desc()),
+            )
+            .label("rn"),
+        ).subquery()
+        session.execute(
+            insert(SensorRollup).from_select(
+                [
+                    "sensor_id",
+                    "resolution",
+                    "bucket",
+                    "count",
+                    "min",
+                    "max",
+                    "sum",
+                    "last",
+                    "last_timestamp",
+                ],
+                select(
+                    ranked.c.sensor_id,
+                    literal(resolution),
+                    ranked.c.bucket,
+                    func.count(),
+                    func.min(ranked.c.value),
+                    func.max(ranked.c.value),
+                    func.sum(ranked.c.value),
+                    func.max(case((ranked.c.rn == 1, ranked.c.value))),
+                    func.max(ranked.c.timestamp),
+                ).group_by(ranked.c.sensor_id, ranked.c.bucket),
+            )
+        )
+    return session.exec(select(func.count()).select_from(SensorRollup)).one()
+
+
+def ensure_rollups(session):
+    """Backfill rollups for databases that have readings but no rollups."""
+    if session.exec(select(SensorRollup.sensor_id).limit(1)).first() is not None:
+        return
+    readings = partitions.readings(session)
+    if session.execute(select(readings.c.id).limit(1)).first() is None:
+        return
+    backfill_rollups(session)
+    session.commit()
+
+
+def choose_resolution(start: datetime, end: datetime, min_points=MIN_CHART_POINTS):
+    """
+    Return the coarsest rollup resolution (in seconds) that still yields at
+    least `min_points` buckets between `start` and `end`, or None when raw
+    readings are needed.
+    """
+    span = (end - start).total_seconds()
+    for resolution in sorted(RESOLUTIONS.values(), reverse=True):
+        if span / resolution >= min_points:
+            return resolution
+    return None
+
+
+def rollup_query(sensor_id: int, resolution: int, start=None, end=None):
+    query = select(SensorRollup).where(
+        SensorRollup.sensor_id == sensor_id, SensorRollup.resolution == resolution
+    )
+    if start:
+        first_bucket = to_epoch(start) // resolution * resolution
+        query = query.where(SensorRollup.bucket >= first_bucket)
+    if end:
+        query = query.where(SensorRollup.bucket <= to_epoch(end))
+    return query.order_by(SensorRollup.bucket.asc())
+
+
+def envelope_points(buckets) -> list[tuple[datetime, float]]:
+    """
+    Each rollup bucket's min and max as chart points, in time order, so
+    peaks and threshold breaches survive downsampling.
+
+    Rollups keep the time of the last reading only: the extreme equal to
+    `last` is placed at that time and the other at the bucket start; when
+    neither is the last value, the extreme nearer to it is assumed to come
+    second.
+    """
+    points = []
+    for bucket in buckets:
+        if bucket.min == bucket.max:
+            points.append((bucket.last_timestamp, bucket.last))
+            continue
+        if bucket.last - bucket.min < bucket.max - bucket.last:
+            first, second = bucket.max, bucket.min
+        else:
+            first, second = bucket.min, bucket.max
+        points.append((from_epoch(bucket.bucket), first))
+        points.append((bucket.last_timestamp, second))
+    return points
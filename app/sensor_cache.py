@@ -0,0 +1,121 @@
+import threading
+from dataclasses import dataclass
+from sqlmodel import select, Session
+from app.models import Sensor
+from app.utils import read_engine
+
+
+def parcel_sensors_query(parcel_id: int):
+    return select(Sensor).where(Sensor.parcel_id == parcel_id)
+
+
+@dataclass(frozen=True)
+class SensorInfo:
+    id: int
+    id_code: str
+    parcel_id: int
+    type: str
+    unit: str
+    description: str
+    threshold_low: float
+    threshold_high: float
+    active: bool
+
+    @classmethod
+    def from_sensor(cls, sensor: Sensor) -> "SensorInfo":
+        return cls(
+            id=sensor.id,
+            id_code=sensor.id_code,
+            parcel_id=sensor.parcel_id,
+            type=sensor.type,
+            unit=sensor.unit,
+            description=sensor.description,
+            threshold_low=sensor.threshold_low,
+            threshold_high=sensor.threshold_high,
+            active=sensor.active,
+        )
+
+
+class SensorCache:
+    """
+    Process-wide cache of sensor metadata keyed by sensor id.
+
+    The whole registry is loaded on first use (or at startup) and kept until
+    invalidated by code that creates or deletes sensors. Ids that are not
+    cached are looked up in the database, all of a call's in one query, and
+    ids found missing are remembered as such until `invalidate`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sensors: dict[int, SensorInfo] = {}
+        self._missing: set[int] = set()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        with Session(read_engine) as session:
+            sensors = session.exec(select(Sensor)).all()
+            infos = {s.id: SensorInfo.from_sensor(s) for s in sensors}
+        with self._lock:
+            self._sensors = infos
+            self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def _fetch(self, sensor_ids: set[int]):
+        """Look up uncached ids with one query and cache the outcome."""
+        self.misses += len(sensor_ids)
+        with Session(read_engine) as session:
+            sensors = session.exec(select(Sensor).where(Sensor.id.in_(sensor_ids)))
+            infos = {s.id: SensorInfo.from_sensor(s) for s in sensors}
+        with self._lock:
+            self._sensors.update(infos)
+            self._missing.update(sensor_ids - infos.keys())
+
+    def get(self, sensor_id: int) -> SensorInfo | None:
+        self._ensure_loaded()
+        if sensor_id in self._sensors or sensor_id in self._missing:
+            self.hits += 1
+        else:
+            self._fetch({sensor_id})
+        return self._sensors.get(sensor_id)
+
+    def all(self) -> list[SensorInfo]:
+        self._ensure_loaded()
+        self.hits += 1
+        return sorted(self._sensors.values(), key=lambda s: s.id)
+
+    def existing_ids(self, sensor_ids) -> set[int]:
+        self._ensure_loaded()
+        sensor_ids = set(sensor_ids)
+        uncached = sensor_ids - self._sensors.keys() - self._missing
+        self.hits += len(sensor_ids) - len(uncached)
+        if uncached:
+            self._fetch(uncached)
+        return sensor_ids & self._sensors.keys()
+
+    def invalidate(self, sensor_id: int | None = None):
+        """Drop one sensor, or the whole registry when no id is given."""
+        with self._lock:
+            if sensor_id is None:
+                self._sensors = {}
+                self._missing = set()
+                self._loaded = False
+            else:
+                self._sensors.pop(sensor_id, None)
+                self._missing.discard(sensor_id)
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self._loaded,
+            "size": len(self._sensors),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+sensor_cache = SensorCache()
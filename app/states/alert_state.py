@@ -1,7 +1,8 @@
 import reflex as rx
-from sqlmodel import select, Session, desc
-from app.models import Alert, Sensor
-from app.utils import engine
+from sqlmodel import Session
+from app.utils import read_engine
+from app.alert_counters import alert_counters
+from app.alerts import acknowledge_alerts, alerts_page
 from datetime import datetime
 
 
@@ -9,51 +10,129 @@ class AlertState(rx.State):
     alerts: list[dict] = []
     filter_type: str = "all"
     show_history: bool = False
+    has_older: bool = False
+    has_newer: bool = False
+    page_anchor: list = []
+    page_direction: str = ""
+    confirm_ack_open: bool = False
+    confirm_ack_count: int = 0
+
+    @rx.var(cache=False)
+    def open_alert_count(self) -> int:
+        """Open alerts across the system, for the navbar badge."""
+        return alert_counters.total()
 
     @rx.event
     def set_filter_type(self, value: str):
         self.filter_type = value
-        self.load_alerts()
+        self.first_page()
 
     @rx.event
     def toggle_history(self, checked: bool):
         self.show_history = checked
+        self.first_page()
+
+    @rx.event
+    def first_page(self):
+        self.page_anchor = []
+        self.page_direction = ""
+        self.load_alerts()
+
+    @rx.event
+    def older_page(self):
+        if not self.has_older or not self.alerts:
+            return
+        self.page_anchor = self.alerts[-1]["cursor"]
+        self.page_direction = "before"
+        self.load_alerts()
+
+    @rx.event
+    def newer_page(self):
+        if not self.has_newer or not self.alerts:
+            return
+        self.page_anchor = self.alerts[0]["cursor"]
+        self.page_direction = "after"
         self.load_alerts()
 
     @rx.event
     def load_alerts(self):
-        with Session(engine) as session:
-            query = select(Alert)
-            if not self.show_history:
-                query = query.where(Alert.acknowledged == False)
-            if self.filter_type != "all":
-                query = query.where(Alert.type == self.filter_type)
-            query = query.order_by(desc(Alert.timestamp))
-            results = session.exec(query).all()
-            display_list = []
-            for a in results:
-                s = session.get(Sensor, a.sensor_id)
-                display_list.append(
-                    {
-                        "id": a.id,
-                        "sensor_code": s.id_code if s else "Unknown",
-                        "sensor_type": s.type if s else "",
-                        "type": a.type,
-                        "message": a.message,
-                        "timestamp": a.timestamp.strftime("%Y-%m-%d %H:%M"),
-                        "acknowledged": a.acknowledged,
-                        "color": "red" if a.type == "HIGH" else "amber",
-                    }
-                )
-            self.alerts = display_list
+        anchor = None
+        if self.page_anchor:
+            anchor = (datetime.fromisoformat(self.page_anchor[0]), self.page_anchor[1])
+        with Session(read_engine) as session:
+            page, has_older, has_newer = alerts_page(
+                session,
+                self.filter_type,
+                self.show_history,
+                before=anchor if self.page_direction == "before" else None,
+                after=anchor if self.page_direction == "after" else None,
+            )
+        if not page and anchor is not None:
+            self.first_page()
+            return
+        if not has_newer and anchor is not None:
+            self.page_anchor = []
+            self.page_direction = ""
+        self.alerts = page
+        self.has_older = has_older
+        self.has_newer = has_newer
+
+    def _apply_acknowledged(self, alert_ids: list[int]):
+        """Update the current page in place instead of reloading it."""
+        acknowledged = set(alert_ids)
+        if self.show_history:
+            self.alerts = [
+                {**a, "acknowledged": True} if a["id"] in acknowledged else a
+                for a in self.alerts
+            ]
+        else:
+            self.alerts = [a for a in self.alerts if a["id"] not in acknowledged]
 
     @rx.event
     def acknowledge_alert(self, alert_id: int):
-        with Session(engine) as session:
-            alert = session.get(Alert, alert_id)
-            if alert:
-                alert.acknowledged = True
-                session.add(alert)
-                session.commit()
-        self.load_alerts()
-        return rx.toast("Alert acknowledged", duration=3000, close_button=True)
\ No newline at end of file
+        self._apply_acknowledged(acknowledge_alerts(alert_ids=[alert_id]))
+        return rx.toast("Alert acknowledged", duration=3000, close_button=True)
+
+    @rx.event
+    def acknowledge_page(self):
+        alert_ids = [a["id"] for a in self.alerts if not a["acknowledged"]]
+        if not alert_ids:
+            return
+        acknowledged = acknowledge_alerts(alert_ids=alert_ids)
+        self._apply_acknowledged(acknowledged)
+        if not self.alerts and (self.has_older or self.has_newer):
+            self.load_alerts()
+        return rx.toast(
+            f"{len(acknowledged)} alerts acknowledged", duration=3000, close_button=True
+        )
+
+    @rx.event
+    def confirm_acknowledge_matching(self):
+        """Ask before `acknowledge_matching`, showing how many alerts it clears."""
+        if self.filter_type == "all":
+            count = alert_counters.total()
+        else:
+            count = alert_counters.by_type(self.filter_type)
+        if not count:
+            return rx.toast("No open alerts to acknowledge", duration=3000)
+        self.confirm_ack_count = count
+        self.confirm_ack_open = True
+
+    @rx.event
+    def cancel_acknowledge_matching(self):
+        self.confirm_ack_open = False
+
+    @rx.event
+    def acknowledge_matching(self):
+        """Acknowledge every open alert of the selected type, on any page."""
+        self.confirm_ack_open = False
+        alert_type = None if self.filter_type == "all" else self.filter_type
+        acknowledged = acknowledge_alerts(alert_type=alert_type)
+        self._apply_acknowledged(acknowledged)
+        if not self.show_history:
+            self.has_older = self.has_newer = False
+            self.page_anchor = []
+            self.page_direction = ""
+        return rx.toast(
+            f"{len(acknowledged)} alerts acknowledged", duration=3000, close_button=True
+        )
@@ -1,8 +1,5 @@
 import reflex as rx
-from sqlmodel import select
-from app.models import User
-from app.utils import verify_password, seed_database
-import asyncio
+from app.utils import authenticate_async, seed_database
 
 
 class AuthState(rx.State):
@@ -20,7 +17,10 @@ class AuthState(rx.State):
 
     @rx.event(background=True)
     async def check_login(self, form_data: dict):
-        """Attempt to log the user in."""
+        """
+        Attempt to log the user in. The password check runs on the auth
+        thread pool without holding the state lock.
+        """
         async with self:
             self.username = form_data.get("username", "")
             self.password = form_data.get("password", "")
@@ -29,22 +29,18 @@ class AuthState(rx.State):
                 return
             self.is_loading = True
             self.error_message = ""
-        await asyncio.sleep(0.8)
+            username, password = self.username, self.password
+        user = await authenticate_async(username, password)
         async with self:
-            with rx.session() as session:
-                user = session.exec(
-                    select(User).where(User.username == self.username)
-                ).first()
-                if user and verify_password(self.password, user.password_hash):
-                    self.user_id = user.id
-                    self.user_role = user.role
-                    self.user_name = user.username
-                    self.is_loading = False
-                    self.password = ""
-                    return rx.redirect("/")
-                else:
-                    self.is_loading = False
-                    self.error_message = "Invalid username or password."
+            self.is_loading = False
+            if user is None:
+                self.error_message = "Invalid username or password."
+                return
+            self.user_id = user.id
+            self.user_role = user.role
+            self.user_name = user.username
+            self.password = ""
+        return rx.redirect("/")
 
     @rx.event
     def logout(self):
@@ -2,7 +2,7 @@ import reflex as rx
 import logging
 from sqlmodel import select, Session
 from app.models import Parcel, Sensor
-from app.utils import engine
+from app.utils import engine, read_engine
 from app.states.auth_state import AuthState
 
 
@@ -16,7 +16,7 @@ class ParcelState(rx.State):
 
     @rx.event
     def load_parcels(self):
-        with Session(engine) as session:
+        with Session(read_engine) as session:
             self.parcels = session.exec(select(Parcel)).all()
 
     @rx.event
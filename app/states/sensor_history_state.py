@@ -1,9 +1,20 @@
 import reflex as rx
 import logging
+from dataclasses import asdict
 from datetime import datetime, timedelta
-from sqlmodel import select, Session
-from app.models import Sensor, SensorData, Parcel
-from app.utils import engine
+from sqlmodel import Session
+from app.models import Sensor, Parcel
+from app.utils import read_engine
+from app.sensor_cache import sensor_cache
+from app.rollups import (
+    RAW_CHART_LIMIT,
+    choose_resolution,
+    envelope_points,
+    rollup_query,
+    to_epoch,
+)
+from app.downsample import lttb
+from app.history import history_points, history_stats
 
 
 class SensorHistoryState(rx.State):
@@ -14,6 +25,12 @@ class SensorHistoryState(rx.State):
     stat_min: float = 0.0
     stat_max: float = 0.0
     stat_avg: float = 0.0
+    stat_stddev: float = 0.0
+    stat_p50: float = 0.0
+    stat_p95: float = 0.0
+    stat_in_range: float = 0.0
+    chart_points: int = 1000
+    raw_point_count: int = 0
 
     @rx.var
     def sensor_code(self) -> str:
@@ -49,6 +66,30 @@ class SensorHistoryState(rx.State):
     def stat_avg_str(self) -> str:
         return f"{self.stat_avg:.1f}"
 
+    @rx.var
+    def stat_stddev_str(self) -> str:
+        return f"{self.stat_stddev:.1f}"
+
+    @rx.var
+    def stat_p50_str(self) -> str:
+        return f"{self.stat_p50:.1f}"
+
+    @rx.var
+    def stat_p95_str(self) -> str:
+        return f"{self.stat_p95:.1f}"
+
+    @rx.var
+    def stat_in_range_str(self) -> str:
+        return f"{self.stat_in_range * 100:.0f}"
+
+    @rx.var
+    def raw_point_count_str(self) -> str:
+        return f"{self.raw_point_count:,}"
+
+    @rx.var
+    def point_count_str(self) -> str:
+        return f"{len(self.history_data):,} of {self.raw_point_count:,} points"
+
     @rx.var
     def sensor_id_param(self) -> int:
         sid_str = self.router.page.params.get("id", "")
@@ -68,13 +109,15 @@ class SensorHistoryState(rx.State):
     @rx.event
     def load_history(self):
         self.history_data = []
+        self.raw_point_count = 0
         self.sensor = None
         sid = self.sensor_id_param
         if not sid:
             return
-        with Session(engine) as session:
-            self.sensor = session.get(Sensor, sid)
-            if self.sensor:
+        info = sensor_cache.get(sid)
+        with Session(read_engine) as session:
+            if info:
+                self.sensor = Sensor(**asdict(info))
                 parcel = session.get(Parcel, self.sensor.parcel_id)
                 self.parcel_name = parcel.name if parcel else "Unknown Parcel"
             else:
@@ -89,34 +132,42 @@ class SensorHistoryState(rx.State):
                 start_time = now - timedelta(days=30)
             else:
                 start_time = now - timedelta(days=365)
-            query = (
-                select(SensorData)
-                .where(SensorData.sensor_id == sid, SensorData.timestamp >= start_time)
-                .order_by(SensorData.timestamp.asc())
-            )
-            data_points = session.exec(query).all()
+            stats = history_stats(session, self.sensor, start_time, now)
+            resolution = choose_resolution(start_time, now)
+            if resolution and stats["count"] > RAW_CHART_LIMIT:
+                buckets = session.exec(
+                    rollup_query(sid, resolution, start_time, now)
+                ).all()
+                points = envelope_points(buckets)
+            else:
+                points = history_points(session, sid, start_time, now)
+            if len(points) > self.chart_points:
+                keep = lttb(
+                    [to_epoch(ts) for ts, _ in points],
+                    [value for _, value in points],
+                    self.chart_points,
+                )
+                points = [points[i] for i in keep]
             chart_data = []
-            values = []
-            for pt in data_points:
+            for ts, value in points:
                 ts_str = (
-                    pt.timestamp.strftime("%m-%d %H:%M")
+                    ts.strftime("%m-%d %H:%M")
                     if self.time_range != "24h"
-                    else pt.timestamp.strftime("%H:%M")
+                    else ts.strftime("%H:%M")
                 )
                 chart_data.append(
                     {
                         "time": ts_str,
-                        "value": pt.value,
-                        "raw_ts": pt.timestamp.isoformat(),
+                        "value": value,
+                        "raw_ts": ts.isoformat(),
                     }
                 )
-                values.append(pt.value)
             self.history_data = chart_data
-            if values:
-                self.stat_min = min(values)
-                self.stat_max = max(values)
-                self.stat_avg = sum(values) / len(values)
-            else:
-                self.stat_min = 0.0
-                self.stat_max = 0.0
-                self.stat_avg = 0.0
\ No newline at end of file
+            self.raw_point_count = stats["count"]
+            self.stat_min = stats["min"]
+            self.stat_max = stats["max"]
+            self.stat_avg = stats["avg"]
+            self.stat_stddev = stats["stddev"]
+            self.stat_p50 = stats["p50"]
+            self.stat_p95 = stats["p95"]
+            self.stat_in_range = stats["time_in_range"]
@@ -1,8 +1,9 @@
 import reflex as rx
 import logging
-from sqlmodel import select, Session
-from app.models import Sensor, Parcel
-from app.utils import engine
+from sqlmodel import Session
+from app.models import Sensor, SensorLatest, Parcel
+from app.utils import engine, read_engine
+from app.sensor_cache import parcel_sensors_query, sensor_cache
 
 
 class SensorState(rx.State):
@@ -42,12 +43,10 @@ class SensorState(rx.State):
         pid = self.parcel_id
         if not pid:
             return
-        with Session(engine) as session:
+        with Session(read_engine) as session:
             self.current_parcel = session.get(Parcel, pid)
             if self.current_parcel:
-                sensors_objs = session.exec(
-                    select(Sensor).where(Sensor.parcel_id == pid)
-                ).all()
+                sensors_objs = session.exec(parcel_sensors_query(pid)).all()
                 self.sensors = [s.model_dump() for s in sensors_objs]
 
     @rx.event
@@ -106,6 +105,7 @@ class SensorState(rx.State):
             )
             session.add(new_sensor)
             session.commit()
+        sensor_cache.invalidate()
         self.toggle_add_modal()
         self.load_sensors()
 
@@ -114,6 +114,10 @@ class SensorState(rx.State):
         with Session(engine) as session:
             sensor = session.get(Sensor, sensor_id)
             if sensor:
+                latest = session.get(SensorLatest, sensor_id)
+                if latest:
+                    session.delete(latest)
                 session.delete(sensor)
                 session.commit()
+        sensor_cache.invalidate(sensor_id)
         self.load_sensors()
\ No newline at end of file
@@ -1,12 +1,14 @@
+import asyncio
+import os
 import reflex as rx
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
-from sqlmodel import select, create_engine, SQLModel, Session
+from sqlmodel import select, SQLModel, Session
 from app.models import User, Parcel, Sensor, SensorData, Alert
+from app.db import engine, read_engine
 import datetime
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-DATABASE_URL = "sqlite:///reflex.db"
-engine = create_engine(DATABASE_URL)
 
 
 def verify_password(plain_password, hashed_password):
@@ -17,6 +19,39 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+# bcrypt is deliberately slow; logins run it here so the event loop and the
+# state locks stay free, and at most AUTH_WORKERS hashes run at once.
+auth_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("AUTH_WORKERS", "4")),
+    thread_name_prefix="auth",
+)
+
+
+def authenticate(username: str, password: str, engine=read_engine) -> User | None:
+    """Return the user with these credentials, or None."""
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.username == username)).first()
+    if user and verify_password(password, user.password_hash):
+        return user
+    return None
+
+
+async def authenticate_async(username: str, password: str, engine=read_engine):
+    """`authenticate` on the bounded auth thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        auth_executor, authenticate, username, password, engine
+    )
+
+
+def ensure_indexes():
+    """Create indexes declared on the models that an existing database lacks."""
+    SQLModel.metadata.create_all(engine)
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
 def seed_database():
     """Initialize the database with sample data if it's empty."""
     SQLModel.metadata.create_all(engine)
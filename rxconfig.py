@@ -1,3 +1,7 @@
 import reflex as rx
 
-config = rx.Config(app_name="app", plugins=[rx.plugins.TailwindV3Plugin()])
+config = rx.Config(
+    app_name="app",
+    db_url="sqlite:///reflex.db",
+    plugins=[rx.plugins.TailwindV3Plugin()],
+)
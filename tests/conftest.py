@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+
+# The app binds its engines and the archive root at import time, so point
+# them at a scratch directory before anything from `app` is imported.
+_scratch = tempfile.mkdtemp(prefix="agrotech-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_scratch}/test.db"
+os.environ["ARCHIVE_DIR"] = os.path.join(_scratch, "archive")
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import MetaData
+from sqlmodel import Session
+from app.alert_counters import alert_counters
+from app.alert_engine import alert_engine
+from app.api.routes import router
+from app.archive import archive
+from app.models import Parcel, Sensor, User
+from app.partitions import partitions
+from app.sensor_cache import sensor_cache
+from app.utils import engine, ensure_indexes
+
+
+def _reset_database():
+    tables = MetaData()
+    tables.reflect(engine)
+    tables.drop_all(engine)
+    ensure_indexes()
+
+
+@pytest.fixture
+def db():
+    """An empty schema with one parcel and fresh in-memory caches."""
+    _reset_database()
+    shutil.rmtree(archive.root, ignore_errors=True)
+    partitions._schema_version = None
+    sensor_cache.invalidate()
+    alert_engine._states = None
+    alert_counters._loaded = False
+    with Session(engine) as session:
+        session.add(User(id=1, username="u", password_hash="", role="farmer"))
+        session.add(Parcel(id=1, name="p", location="", area=1.0, owner_id=1))
+        session.commit()
+    yield engine
+
+
+@pytest.fixture
+def make_sensor(db):
+    def make(sensor_id: int, threshold_low=10.0, threshold_high=30.0):
+        with Session(engine) as session:
+            session.add(
+                Sensor(
+                    id=sensor_id,
+                    id_code=f"S{sensor_id}",
+                    parcel_id=1,
+                    type="temperature",
+                    unit="C",
+                    description="",
+                    threshold_low=threshold_low,
+                    threshold_high=threshold_high,
+                )
+            )
+            session.commit()
+        sensor_cache.invalidate()
+        return sensor_id
+
+    return make
+
+
+@pytest.fixture
+def client(db):
+    """The API routes on a bare FastAPI app."""
+    api = FastAPI()
+    api.include_router(router)
+    with TestClient(api) as client:
+        yield client
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_scratch, ignore_errors=True)
@@ -0,0 +1,60 @@
+from dataclasses import replace
+from datetime import datetime, timedelta
+from sqlmodel import Session, func, select
+from app.alert_engine import alert_engine
+from app.ingest import build_reading, write_readings
+from app.models import Alert
+from app.utils import engine, read_engine
+
+START = datetime(2025, 1, 1)
+
+
+def _write(sensor_id, value, minutes, commit=True):
+    reading = build_reading(sensor_id, value, START + timedelta(minutes=minutes))
+    with Session(engine) as session:
+        write_readings(session, [reading])
+        if commit:
+            session.commit()
+
+
+def _alerts():
+    with Session(read_engine) as session:
+        return session.exec(select(func.count(Alert.id))).one()
+
+
+def test_rolled_back_alert_is_raised_again(make_sensor):
+    make_sensor(1)
+    _write(1, 50.0, 0, commit=False)
+    assert _alerts() == 0
+    _write(1, 50.0, 1)
+    assert _alerts() == 1
+
+
+def test_rollback_leaves_state_machine_unchanged(make_sensor, monkeypatch):
+    monkeypatch.setattr(alert_engine, "min_duration", timedelta(minutes=5))
+    monkeypatch.setattr(alert_engine, "cooldown", timedelta(minutes=30))
+    make_sensor(1)
+    _write(1, 50.0, 0)
+    before = replace(alert_engine._states[1])
+    assert before.type == "HIGH" and not before.raised
+
+    _write(1, 50.0, 6, commit=False)
+    _write(1, 20.0, 7, commit=False)
+    assert alert_engine._states[1] == before
+    assert _alerts() == 0
+
+    _write(1, 50.0, 8)
+    state = alert_engine._states[1]
+    assert state.raised and state.since == before.since
+    assert state.last_raised == {"HIGH": START + timedelta(minutes=8)}
+    assert _alerts() == 1
+
+
+def test_naive_and_aware_timestamps_mix(client, make_sensor):
+    make_sensor(1)
+    for timestamp in ("2025-01-01T00:00:00", "2025-01-01T00:01:00Z"):
+        response = client.post(
+            "/api/sensors/1/data", json={"timestamp": timestamp, "value": 50.0}
+        )
+        assert response.status_code == 200
+    assert alert_engine._states[1].last_seen == START + timedelta(minutes=1)
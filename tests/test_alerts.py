@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlmodel import Session, select
+import app.states.alert_state as alert_state_module
+from app.alert_counters import alert_counters
+from app.alerts import ALERTS_PAGE_SIZE, acknowledge_alerts, alerts_page
+from app.models import Alert
+from app.states.alert_state import AlertState
+from app.utils import engine, read_engine
+
+START = datetime(2025, 1, 1)
+
+
+def _add_alerts(count: int) -> dict[int, str]:
+    with Session(engine) as session:
+        rows = [
+            Alert(
+                sensor_id=1 + i % 2,
+                type="HIGH" if i % 2 else "LOW",
+                message=f"alert {i}",
+                timestamp=START + timedelta(minutes=i),
+            )
+            for i in range(count)
+        ]
+        session.add_all(rows)
+        session.commit()
+        return {row.id: row.type for row in rows}
+
+
+@pytest.fixture
+def alerts(make_sensor):
+    """Twelve open alerts on two sensors, alternating HIGH and LOW."""
+    make_sensor(1)
+    make_sensor(2)
+    return _add_alerts(12)
+
+
+def _open_ids():
+    with Session(read_engine) as session:
+        query = select(Alert.id).where(Alert.acknowledged == False)
+        return set(session.exec(query).all())
+
+
+def test_acknowledge_by_id_list(alerts):
+    ids = sorted(alerts)[:3]
+    assert sorted(acknowledge_alerts(alert_ids=ids + [9999])) == ids
+    assert _open_ids() == set(alerts) - set(ids)
+    assert acknowledge_alerts(alert_ids=ids) == []
+
+
+def test_acknowledge_by_type(alerts):
+    high = {i for i, type_ in alerts.items() if type_ == "HIGH"}
+    assert alert_counters.by_type("HIGH") == 6
+    assert set(acknowledge_alerts(alert_type="HIGH")) == high
+    assert _open_ids() == set(alerts) - high
+    assert alert_counters.by_type("HIGH") == 0
+    assert alert_counters.by_type("LOW") == 6
+
+
+def _state(**fields):
+    state = AlertState(_reflex_internal_init=True)
+    for name, value in fields.items():
+        setattr(state, name, value)
+    state.load_alerts()
+    return state
+
+
+def _count_reloads(monkeypatch):
+    calls = []
+    alerts_page = alert_state_module.alerts_page
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return alerts_page(*args, **kwargs)
+
+    monkeypatch.setattr(alert_state_module, "alerts_page", counted)
+    return calls
+
+
+def test_acknowledge_page_updates_the_page_in_place(alerts, monkeypatch):
+    state = _state(show_history=True)
+    shown = [a["id"] for a in state.alerts]
+    reloads = _count_reloads(monkeypatch)
+    AlertState.acknowledge_page.fn(state)
+    assert reloads == []
+    assert [a["id"] for a in state.alerts] == shown
+    assert all(a["acknowledged"] for a in state.alerts)
+    assert _open_ids() == set(alerts) - set(shown)
+
+
+def test_acknowledge_all_asks_for_confirmation_first(alerts, monkeypatch):
+    state = _state(filter_type="LOW")
+    AlertState.confirm_acknowledge_matching.fn(state)
+    assert (state.confirm_ack_open, state.confirm_ack_count) == (True, 6)
+    assert len(_open_ids()) == 12
+    AlertState.cancel_acknowledge_matching.fn(state)
+    assert not state.confirm_ack_open
+    assert len(_open_ids()) == 12
+
+    AlertState.confirm_acknowledge_matching.fn(state)
+    reloads = _count_reloads(monkeypatch)
+    AlertState.acknowledge_matching.fn(state)
+    assert reloads == []
+    assert not state.confirm_ack_open
+    assert state.alerts == []
+    assert _open_ids() == {i for i, type_ in alerts.items() if type_ == "HIGH"}
+
+
+def _page(filter_type="all", before=None, after=None):
+    with Session(read_engine) as session:
+        page, has_older, has_newer = alerts_page(
+            session, filter_type, before=before, after=after, limit=4
+        )
+    return [a["id"] for a in page], has_older, has_newer, page
+
+
+def _cursor(alert):
+    timestamp, alert_id = alert["cursor"]
+    return datetime.fromisoformat(timestamp), alert_id
+
+
+def test_filtered_pages_walk_back_and_forth(alerts):
+    low = sorted((i for i, type_ in alerts.items() if type_ == "LOW"), reverse=True)
+    first, has_older, has_newer, page = _page("LOW")
+    assert (first, has_older, has_newer) == (low[:4], True, False)
+
+    second, has_older, has_newer, page = _page("LOW", before=_cursor(page[-1]))
+    assert (second, has_older, has_newer) == (low[4:], False, True)
+
+    back, has_older, has_newer, _ = _page("LOW", after=_cursor(page[0]))
+    assert (back, has_older, has_newer) == (first, True, False)
+
+
+def test_state_pages_keep_their_anchor_across_acknowledgements(make_sensor):
+    make_sensor(1)
+    make_sensor(2)
+    _add_alerts(ALERTS_PAGE_SIZE + 10)
+    state = _state()
+    newest = [a["id"] for a in state.alerts]
+    AlertState.older_page.fn(state)
+    older = [a["id"] for a in state.alerts]
+    assert state.page_direction == "before" and state.has_newer
+    assert set(older).isdisjoint(newest)
+
+    acknowledge_alerts(alert_ids=newest[:1])
+    state.load_alerts()
+    assert [a["id"] for a in state.alerts] == older
+    AlertState.newer_page.fn(state)
+    assert [a["id"] for a in state.alerts][-len(newest) + 1 :] == newest[1:]
+    assert not state.has_newer and state.page_anchor == []
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from random import Random
+import pytest
+from sqlmodel import Session, select
+from app.archive import ArchiveJob, archive
+from app.history import (
+    AGGREGATES,
+    bucketed_history,
+    decode_cursor,
+    history_page,
+    history_stats,
+)
+from app.ingest import build_reading, write_readings
+from app.partitions import partitions
+from app.sensor_cache import sensor_cache
+from app.utils import engine, read_engine
+
+pytest.importorskip("pyarrow")
+
+MONTH = datetime(2025, 1, 1)
+
+
+def _insert(sensor_id, day, value):
+    with Session(engine) as session:
+        (data_id,) = partitions.insert(
+            session, [build_reading(sensor_id, value, datetime(2025, 1, day))]
+        )
+        session.commit()
+    return data_id
+
+
+def _ids(sensor_id):
+    with Session(read_engine) as session:
+        readings = partitions.readings(session, sensor_id)
+        live = session.execute(select(readings.c.id)).all()
+    archived = archive.iter_rows(sensor_id)
+    return sorted(row.id for row in [*live, *archived])
+
+
+@pytest.fixture
+def partitioned(monkeypatch, make_sensor):
+    monkeypatch.setattr(partitions, "enabled", True)
+    make_sensor(1)
+    make_sensor(2)
+
+
+def test_late_row_is_not_dropped_with_the_partition(partitioned, monkeypatch):
+    expected = {1: [_insert(1, 5, 1.0)], 2: [_insert(2, 6, 2.0)]}
+    write_month = archive.write_month
+
+    def write_then_late_row(session, sensor_id, month, batch_size):
+        written = write_month(session, sensor_id, month, batch_size)
+        if sensor_id == 1:
+            expected[1].append(_insert(1, 7, 3.0))
+            expected[2].append(_insert(2, 8, 4.0))
+        return written
+
+    monkeypatch.setattr(archive, "write_month", write_then_late_row)
+    job = ArchiveJob(archive, after_days=1, interval_hours=24, chunk_size=100)
+    job.run(now=datetime(2025, 3, 1))
+
+    with Session(read_engine) as session:
+        assert MONTH in partitions.months(session)
+    assert _ids(1) == sorted(expected[1])
+    assert _ids(2) == sorted(expected[2])
+
+    monkeypatch.setattr(archive, "write_month", write_month)
+    job.run(now=datetime(2025, 3, 1))
+
+    with Session(read_engine) as session:
+        assert MONTH not in partitions.months(session)
+    assert [row.id for row in archive.iter_rows(1)] == sorted(expected[1])
+
+
+def _history(sensor, start, end):
+    with Session(read_engine) as session:
+        stats = history_stats(session, sensor, start, end)
+        buckets = bucketed_history(
+            session, sensor.id, start, end, 86400 * 7 + 13, list(AGGREGATES), 100
+        )
+        pages, cursor = [], None
+        while True:
+            page, next_cursor = history_page(session, sensor.id, start, end, 50, cursor)
+            pages += [(r.id, r.timestamp, r.value) for r in page]
+            if next_cursor is None:
+                break
+            cursor = decode_cursor(next_cursor)
+    return stats, buckets, pages
+
+
+def test_archived_ranges_match_live(make_sensor):
+    make_sensor(1)
+    now = datetime(2025, 6, 15)
+    random = Random(1)
+    readings = [
+        build_reading(1, random.uniform(0, 40), now - timedelta(minutes=97 * i))
+        for i in range(3000)
+    ]
+    with Session(engine) as session:
+        write_readings(session, readings)
+        session.commit()
+    sensor = sensor_cache.get(1)
+    ranges = [(None, None), (now - timedelta(days=150), now - timedelta(days=20))]
+    before = [_history(sensor, *r) for r in ranges]
+
+    job = ArchiveJob(archive, after_days=60, interval_hours=24, chunk_size=500)
+    assert job.run(now=now)["archived"]
+    assert archive.months(1)
+
+    for expected, r in zip(before, ranges):
+        stats, buckets, pages = _history(sensor, *r)
+        assert stats == pytest.approx(expected[0], rel=1e-6)
+        assert len(buckets) == len(expected[1])
+        for bucket, expected_bucket in zip(buckets, expected[1]):
+            assert bucket.pop("bucket_start") == expected_bucket.pop("bucket_start")
+            assert bucket == pytest.approx(expected_bucket)
+        assert pages == expected[2]
@@ -0,0 +1,55 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+from app.dashboard_feed import SNAPSHOT_QUERIES, compute_snapshot
+from app.models import Alert, Parcel, Sensor, SensorLatest, User
+
+
+def _seeded_engine(sensors: int):
+    memory = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    SQLModel.metadata.create_all(memory)
+    with Session(memory) as session:
+        session.add(User(id=1, username="u", password_hash="", role="farmer"))
+        session.add(Parcel(id=1, name="p", location="", area=1.0, owner_id=1))
+        for i in range(1, sensors + 1):
+            session.add(
+                Sensor(
+                    id=i,
+                    id_code=f"S{i}",
+                    parcel_id=1,
+                    type="temperature",
+                    unit="C",
+                    description="",
+                    threshold_low=0.0,
+                    threshold_high=1.0,
+                )
+            )
+            session.add(
+                SensorLatest(
+                    sensor_id=i, timestamp=datetime.utcnow(), value=2.0, status="red"
+                )
+            )
+            session.add(Alert(sensor_id=i, type="HIGH", message="m"))
+        session.commit()
+    return memory
+
+
+@pytest.mark.parametrize("sensors", [1, 10, 100])
+def test_snapshot_runs_a_constant_number_of_queries(db, sensors):
+    memory = _seeded_engine(sensors)
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(memory, "before_cursor_execute", count)
+    snapshot = compute_snapshot(memory)
+    memory.dispose()
+    assert len(snapshot["sensor_statuses"]) == sensors
+    assert len(statements) == SNAPSHOT_QUERIES
@@ -0,0 +1,34 @@
+import threading
+from app.db import create_writer_engine
+
+
+def test_concurrent_read_then_write_transactions_are_serialized(tmp_path):
+    writer = create_writer_engine(f"sqlite:///{tmp_path}/writes.db")
+    with writer.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE counter (n INTEGER)")
+
+    def increment():
+        for _ in range(50):
+            with writer.begin() as connection:
+                n = connection.exec_driver_sql("SELECT count(*) FROM counter").scalar()
+                connection.exec_driver_sql("INSERT INTO counter VALUES (?)", (n,))
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with writer.connect() as connection:
+        rows = connection.exec_driver_sql(
+            "SELECT count(*), count(DISTINCT n) FROM counter"
+        ).one()
+    writer.dispose()
+    assert tuple(rows) == (200, 200)
+
+
+def test_vacuum_runs_outside_a_transaction(tmp_path):
+    writer = create_writer_engine(f"sqlite:///{tmp_path}/vacuum.db")
+    autocommit = writer.execution_options(isolation_level="AUTOCOMMIT")
+    with autocommit.connect() as connection:
+        connection.exec_driver_sql("VACUUM")
+    writer.dispose()
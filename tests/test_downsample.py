@@ -0,0 +1,14 @@
+import numpy as np
+import pytest
+from app.downsample import lttb
+
+
+def test_small_thresholds():
+    x = np.arange(10)
+    y = np.sin(x)
+    assert lttb(x, y, 2).tolist() == [0, 9]
+    assert lttb(x, y, 3).tolist()[::2] == [0, 9]
+    assert len(lttb(x, y, 3)) == 3
+    assert lttb(x[:2], y[:2], 2).tolist() == [0, 1]
+    with pytest.raises(ValueError):
+        lttb(x, y, 1)
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+from sqlmodel import Session
+from app.ingest import build_reading, write_readings
+from app.utils import engine
+
+START = datetime(2025, 1, 1)
+
+
+def test_pages_with_a_cursor_and_an_aware_end(client, make_sensor):
+    make_sensor(1)
+    with Session(engine) as session:
+        write_readings(
+            session,
+            [build_reading(1, i, START + timedelta(hours=i)) for i in range(30)],
+        )
+        session.commit()
+    params = {"limit": 3, "to": "2025-01-01T12:00:00Z"}
+    values = []
+    while True:
+        response = client.get("/api/sensors/1/data", params=params)
+        assert response.status_code == 200
+        values += [reading["value"] for reading in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert values == [float(i) for i in range(12, -1, -1)]
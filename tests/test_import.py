@@ -0,0 +1,47 @@
+from sqlmodel import Session, func, select
+from app.models import SensorData
+from app.utils import read_engine
+
+
+def _readings():
+    with Session(read_engine) as session:
+        return session.exec(select(func.count(SensorData.id))).one()
+
+
+def test_csv_import_with_a_byte_order_mark(client, make_sensor):
+    make_sensor(1)
+    body = "\ufeffsensor_id,timestamp,value\n1,2025-01-01T00:00:00,20.5\n"
+    response = client.post(
+        "/api/sensors/data/import?format=csv", content=body.encode("utf-8")
+    )
+    assert response.json()["inserted"] == 1
+    assert response.json()["rejected"] == 0
+
+
+def test_import_rejects_unknown_sensors_and_bad_lines(client, make_sensor):
+    make_sensor(1)
+    lines = [
+        '{"sensor_id": 1, "value": 1}',
+        '{"sensor_id": 9, "value": 2}',
+        "not json",
+        '{"sensor_id": 1}',
+        '{"sensor_id": 1, "value": 3}',
+        '{"sensor_id": 9, "value": 4}',
+    ]
+    response = client.post(
+        "/api/sensors/data/import?chunk_size=2", content="\n".join(lines)
+    )
+    result = response.json()
+    assert (result["inserted"], result["rejected"]) == (2, 4)
+    assert [r["line"] for r in result["rejected_lines"]] == [2, 3, 4, 6]
+    assert result["rejected_lines"][0]["detail"] == "Sensor not found"
+    assert _readings() == 2
+
+
+def test_import_rejects_a_chunk_size_below_one(client, make_sensor):
+    make_sensor(1)
+    response = client.post(
+        "/api/sensors/data/import?chunk_size=0", content='{"sensor_id": 1, "value": 1}'
+    )
+    assert response.status_code == 400
+    assert _readings() == 0
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+from sqlmodel import Session
+from app.ingest import build_reading, write_readings
+from app.models import SensorLatest
+from app.utils import engine, read_engine
+
+
+def test_latest_reading_of_a_batch_mixing_naive_and_aware_timestamps(make_sensor):
+    make_sensor(1)
+    naive = datetime(2025, 1, 1, 12, 0)
+    aware = datetime(2025, 1, 1, 13, 30, tzinfo=timezone(timedelta(hours=1)))
+    with Session(engine) as session:
+        write_readings(
+            session, [build_reading(1, 20.0, aware), build_reading(1, 25.0, naive)]
+        )
+        session.commit()
+    with Session(read_engine) as session:
+        latest = session.get(SensorLatest, 1)
+    assert (latest.timestamp, latest.value) == (datetime(2025, 1, 1, 12, 30), 20.0)
+
+
+def test_batch_reports_a_status_per_item(client, make_sensor):
+    make_sensor(1)
+    readings = [
+        {"sensor_id": 1, "value": 21.5, "timestamp": "2025-01-01T00:00:00"},
+        {"sensor_id": 9, "value": 22.0},
+        {"sensor_id": 1, "value": "warm"},
+        {"sensor_id": 1, "value": 23.0, "timestamp": "2025-01-01T00:01:00"},
+    ]
+    response = client.post("/api/sensors/data/batch", json={"readings": readings})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["accepted"], body["rejected"]) == (2, 2)
+    results = body["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert [r["status"] for r in results] == ["success", "error", "error", "success"]
+    assert results[1]["detail"] == "Sensor not found"
+    assert results[2]["detail"].startswith("value:")
+    assert results[3]["data_id"] > results[0]["data_id"]
+    with Session(read_engine) as session:
+        assert session.get(SensorLatest, 1).value == 23.0
@@ -0,0 +1,60 @@
+import asyncio
+import time
+from sqlmodel import Session, func, select
+from app.ingest import build_reading
+from app.ingest_queue import DURABILITY_ENQUEUE, IngestQueue
+from app.models import SensorData
+from app.utils import read_engine
+
+
+def _queue(drain_timeout):
+    return IngestQueue(
+        enabled=True,
+        durability=DURABILITY_ENQUEUE,
+        max_batch=5,
+        flush_ms=50,
+        max_size=100,
+        drain_timeout=drain_timeout,
+    )
+
+
+def _readings():
+    with Session(read_engine) as session:
+        return session.exec(select(func.count(SensorData.id))).one()
+
+
+def test_shutdown_commits_queued_readings(make_sensor):
+    make_sensor(1)
+    queue = _queue(drain_timeout=10)
+
+    async def serve():
+        async with queue.lifespan():
+            for i in range(20):
+                await queue.submit(build_reading(1, 20.0 + i))
+            assert queue.pending()
+
+    asyncio.run(serve())
+    assert _readings() == 20
+    assert queue.committed == 20
+
+
+def test_shutdown_gives_up_after_the_drain_timeout(make_sensor, monkeypatch):
+    make_sensor(1)
+    queue = _queue(drain_timeout=0.1)
+    commit = queue._commit
+
+    def slow_commit(readings):
+        time.sleep(0.5)
+        return commit(readings)
+
+    monkeypatch.setattr(queue, "_commit", slow_commit)
+
+    async def serve():
+        started = asyncio.get_running_loop().time()
+        async with queue.lifespan():
+            for i in range(20):
+                await queue.submit(build_reading(1, 20.0 + i))
+        return asyncio.get_running_loop().time() - started
+
+    assert asyncio.run(serve()) < 0.5
+    assert queue.committed < 20
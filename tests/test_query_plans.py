@@ -0,0 +1,18 @@
+from datetime import datetime
+import pytest
+from sqlmodel import Session
+from app.partitions import month_start, partitions
+from app.query_plans import check_query_plans
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_hot_queries_use_indexes(db, monkeypatch, partitioned):
+    if partitioned:
+        monkeypatch.setattr(partitions, "enabled", True)
+        with Session(db) as session:
+            partitions.ensure(session, month_start(datetime.utcnow()))
+            session.commit()
+    report = check_query_plans(db)
+    assert report
+    scans = {name: scans for name, (plan, scans) in report.items() if scans}
+    assert scans == {}
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlmodel import Session, select
+from app.archive import archive, archive_job
+from app.history import bucketed_history
+from app.ingest import build_reading, write_readings
+from app.partitions import partitions
+from app.retention import RetentionJob, retention_job
+from app.utils import engine, read_engine
+
+NOW = datetime(2025, 6, 15)
+
+
+def _write(*timestamps):
+    with Session(engine) as session:
+        write_readings(session, [build_reading(1, 20.0, ts) for ts in timestamps])
+        session.commit()
+
+
+def _live():
+    with Session(read_engine) as session:
+        readings = partitions.readings(session, 1)
+        return sorted(session.exec(select(readings.c.timestamp)).all())
+
+
+def test_retention_keeps_readings_the_archive_has_not_moved(make_sensor, monkeypatch):
+    pytest.importorskip("pyarrow")
+    make_sensor(1)
+    monkeypatch.setattr(archive_job, "after_days", 60)
+    _write(datetime(2025, 1, 10), datetime(2025, 2, 10), datetime(2025, 5, 10))
+    archive_job.run(now=NOW)
+    assert archive.months(1) == [datetime(2025, 1, 1), datetime(2025, 2, 1)]
+    late = datetime(2025, 2, 20)
+    _write(datetime(2025, 1, 20), late)
+
+    job = RetentionJob(
+        raw_days=10,
+        rollup_days=0,
+        archive_days=120,
+        interval_hours=24,
+        chunk_size=100,
+        vacuum_pages=100,
+    )
+    report = job.run(now=NOW)
+
+    assert report["archive_files_deleted"] == 1
+    assert archive.months(1) == [datetime(2025, 2, 1)]
+    assert report["raw_deleted"] == 1
+    assert _live() == [late, datetime(2025, 5, 10)]
+
+
+def test_hourly_buckets_older_than_the_rollups_come_from_raw_readings(
+    make_sensor, monkeypatch
+):
+    make_sensor(1)
+    end = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=6)
+    _write(*(start + timedelta(minutes=20 * i) for i in range(3 * 24 * 6)))
+
+    def hourly():
+        with Session(read_engine) as session:
+            return bucketed_history(
+                session,
+                1,
+                start,
+                end - timedelta(seconds=1),
+                3600,
+                ["count", "min"],
+                1000,
+            )
+
+    expected = hourly()
+    assert len(expected) == 24 * 6
+    monkeypatch.setattr(retention_job, "rollup_days", 3)
+    retention_job.prune_rollups(end - timedelta(days=3))
+    assert hourly() == expected
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from app.downsample import lttb
+from app.models import SensorRollup
+from app.rollups import envelope_points, to_epoch
+
+
+def _bucket(start: datetime, values: list[float]) -> SensorRollup:
+    return SensorRollup(
+        sensor_id=1,
+        resolution=60,
+        bucket=to_epoch(start),
+        count=len(values),
+        min=min(values),
+        max=max(values),
+        sum=sum(values),
+        last=values[-1],
+        last_timestamp=start + timedelta(seconds=len(values) - 1),
+    )
+
+
+def test_envelope_points_are_ordered_around_the_last_reading():
+    start = datetime(2024, 1, 1)
+    rising, falling = _bucket(start, [1.0, 5.0]), _bucket(start, [5.0, 1.0])
+    assert envelope_points([rising]) == [(start, 1.0), (rising.last_timestamp, 5.0)]
+    assert envelope_points([falling]) == [(start, 5.0), (falling.last_timestamp, 1.0)]
+    assert envelope_points([_bucket(start, [2.0])]) == [(start, 2.0)]
+
+
+def test_downsampled_envelope_keeps_a_spike():
+    start = datetime(2024, 1, 1)
+    buckets = [
+        _bucket(start + timedelta(minutes=i), [20.0] * 59 + [20.5])
+        for i in range(3000)
+    ]
+    spike = start + timedelta(minutes=1234)
+    buckets[1234] = _bucket(spike, [20.0] * 30 + [45.0] + [20.0] * 29)
+    points = envelope_points(buckets)
+    keep = lttb([to_epoch(ts) for ts, _ in points], [v for _, v in points], 500)
+    assert 45.0 in [points[i][1] for i in keep]
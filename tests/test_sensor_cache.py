@@ -0,0 +1,35 @@
+from sqlalchemy import event
+from app.sensor_cache import sensor_cache
+from app.utils import read_engine
+
+
+def _count_queries():
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(read_engine, "before_cursor_execute", count)
+    return statements, lambda: event.remove(read_engine, "before_cursor_execute", count)
+
+
+def test_unknown_ids_are_looked_up_once_in_one_query(make_sensor):
+    make_sensor(1)
+    make_sensor(2)
+    sensor_cache.load()
+    sensor_cache.invalidate(2)
+    statements, stop = _count_queries()
+    try:
+        assert sensor_cache.existing_ids([1, 2, 3, 4]) == {1, 2}
+        assert len(statements) == 1
+        assert sensor_cache.get(3) is None
+        assert sensor_cache.existing_ids([2, 3, 4]) == {2}
+        assert len(statements) == 1
+    finally:
+        stop()
+
+
+def test_invalidate_forgets_missing_ids(make_sensor):
+    assert sensor_cache.get(5) is None
+    make_sensor(5)
+    assert sensor_cache.get(5) is not None